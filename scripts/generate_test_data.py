@@ -6,7 +6,7 @@ from kirc.config import load_settings
 from kirc.db.client import DatabaseClient
 from kirc.db.models import Contact, Channel, Message, ServiceConfig, ServiceType, UserProfile
 from kirc.kafka.client import KafkaClient
-from kirc.kafka.messages import ChatMessage, MessageType
+from kirc.kafka.messages import chat_message, direct_message
 
 async def create_profile(db: DatabaseClient, settings):
     # Ensure a user profile exists
@@ -57,26 +57,20 @@ async def publish_messages(kafka: KafkaClient, settings, channels, contacts):
     # Publish a few chat messages to each channel
     for channel in channels:
         for i in range(3):
-            msg = ChatMessage(
-                type=MessageType.CHAT,
-                sender=settings.user_config.username,
-                recipient=None,
+            msg = chat_message(
+                settings.user_config.username,
+                f"Test message {i+1} in {channel.name}",
                 channel=channel.name,
-                content=f"Test message {i+1} in {channel.name}",
                 timestamp=datetime.now(timezone.utc),
-                payload={},
             )
             await kafka.produce(msg)
         # Simulate a direct message to each contact
         for contact in contacts:
-            dm = ChatMessage(
-                type=MessageType.DIRECT,
-                sender=settings.user_config.username,
-                recipient=contact.username,
-                channel=None,
-                content=f"Hello {contact.username}!",
+            dm = direct_message(
+                settings.user_config.username,
+                contact.username,
+                f"Hello {contact.username}!",
                 timestamp=datetime.now(timezone.utc),
-                payload={},
             )
             await kafka.produce(dm)
 
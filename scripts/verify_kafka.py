@@ -1,7 +1,7 @@
 import asyncio
 import ssl
 from aiokafka import AIOKafkaProducer
-from kirc.kafka.messages import ChatMessage
+from kirc.kafka.messages import chat_message
 
 async def test_connection():
     bootstrap_servers = "kafka-kirc-ververica-65ab.c.aivencloud.com:16760"
@@ -25,11 +25,7 @@ async def test_connection():
         await producer.start()
         print("✅ Successfully connected to Aiven Kafka!")
         
-        msg = ChatMessage(
-            sender="verifier",
-            content="Connectivity Test",
-            channel="SYSTEM"
-        )
+        msg = chat_message("verifier", "Connectivity Test", channel="SYSTEM")
         
         await producer.send_and_wait("data-in", msg.to_bytes())
         print("✅ Successfully sent test message to 'data-in'")
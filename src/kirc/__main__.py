@@ -4,9 +4,14 @@ from kirc.app import KircApp
 
 
 def main() -> None:
-    """Run the K-IRC application."""
+    """Run the K-IRC application, on uvloop when it is installed."""
     app = KircApp()
-    app.run()
+    try:
+        import uvloop
+    except ImportError:
+        app.run()
+    else:
+        app.run(loop=uvloop.new_event_loop())
 
 
 if __name__ == "__main__":
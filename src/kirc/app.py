@@ -1,8 +1,11 @@
 """Main K-IRC Textual application."""
 
 import asyncio
+import functools
 import logging
-from datetime import datetime, timezone
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from datetime import UTC, datetime, timezone
 from pathlib import Path
 import base64
 from uuid import uuid4
@@ -13,12 +16,12 @@ from textual.reactive import reactive
 from textual.containers import Horizontal, Vertical
 from textual.widgets import Footer, Header, Input, Static, ListView
 
-from kirc.config import load_settings
+from kirc.config import Settings, load_settings
 from kirc.kafka.client import KafkaClient
-from kirc.kafka.messages import ChatMessage as KircChatMessage
+from kirc.kafka.messages import Message as KafkaMessage, MessageType, chat_message
 from kirc.cache.client import CacheClient
 from kirc.db.client import DatabaseClient
-from kirc.db.models import Channel
+from kirc.db.models import Channel, Message as StoredMessage
 from kirc.crypto import (
     generate_symmetric_key,
     encrypt_symmetric,
@@ -32,6 +35,9 @@ from kirc.tui.exchange import InviteGenScreen, InviteAcceptScreen, ShowIdentityS
 from kirc.tui.wizard import WizardScreen
 from kirc.tui.settings import SettingsScreen
 
+# Seconds between database pool pings
+DB_HEALTH_CHECK_INTERVAL = 60.0
+
 
 class KircApp(App):
     """K-IRC: Kafka Relay Chat TUI Application."""
@@ -58,27 +64,48 @@ class KircApp(App):
         self.kafka_client: KafkaClient | None = None
         self.cache_client: CacheClient | None = None
         self.db_client: DatabaseClient | None = None
-        self.settings = load_settings()
         self._kafka_task: asyncio.Task | None = None
         self._cache_task: asyncio.Task | None = None
         
-        # Setup Logger
+        # Setup Logger: records are queued and formatted/written by a listener thread,
+        # so logging from the consumer loops never blocks on file IO
         self.logger = logging.getLogger("kirc")
         self.logger.setLevel(logging.INFO)
         fh = logging.FileHandler("kirc.log")
         fh.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-        self.logger.addHandler(fh)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(log_queue))
+        self._log_listener = QueueListener(log_queue, fh)
+        self._log_listener.start()
         self.logger.info("Application starting...")
         
         self.private_key: bytes | None = None
         self.public_key: bytes | None = None
+        # Our public key PEM as shown/shared by the identity and invite screens
+        self.public_key_text: str | None = None
         self.channel_keys: dict[str, dict[str, bytes]] = {} # channel_name -> {key_id -> symmetric_key}
         self.active_key_ids: dict[str, str] = {} # channel_name -> active_key_id
 
     current_channel = reactive("NET_RUNNERS")
 
+    @functools.cached_property
+    def settings(self) -> Settings:
+        """Application settings, loaded once per app lifetime."""
+        return load_settings()
+
+    @functools.cached_property
+    def cert_status(self) -> tuple[bool, bool, bool]:
+        """Whether the Kafka CA cert, client cert and client key files exist (checked once)."""
+        kafka = self.settings.kafka
+        return tuple(
+            bool(path) and Path(path).exists()
+            for path in (kafka.ssl_cafile, kafka.ssl_certfile, kafka.ssl_keyfile)
+        )
+
     async def on_mount(self) -> None:
         """Initialize and check for first-time setup."""
+        await self.load_public_key_text()
+
         # 1. Start DB to check profile
         self.db_client = DatabaseClient(dsn=self.settings.postgres.uri)
         try:
@@ -95,6 +122,14 @@ class KircApp(App):
             # If DB fails, maybe it's not set up yet
             self.push_screen(WizardScreen())
 
+    async def load_public_key_text(self) -> None:
+        """Read our public key PEM once, off the event loop."""
+        pub_path = Path(self.settings.user_config.private_key_path).with_suffix(".pub")
+        try:
+            self.public_key_text = await asyncio.to_thread(pub_path.read_text)
+        except OSError:
+            self.public_key_text = None
+
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
         with Horizontal(id="main-container"):
@@ -126,8 +161,9 @@ class KircApp(App):
                 # Load local history first
                 if self.db_client:
                     messages = await self.db_client.get_messages(channel=self.current_channel, limit=50)
-                    for msg in messages:
-                        await message_list.add_message(msg.sender, msg.content)
+                    # History comes back newest-first; render oldest at the top
+                    for msg in reversed(messages):
+                        await message_list.add_message(msg.sender, msg.content.decode("utf-8"))
                 
                 # Then fetch fresh history from leader if possible
                 if self.cache_client:
@@ -146,8 +182,12 @@ class KircApp(App):
         if not self.db_client:
             return
 
+        # Load channels and contacts over a single pooled connection
+        async with self.db_client.session() as db:
+            channels = await db.get_all_channels()
+            contacts = await db.get_all_contacts()
+
         # Update Channels from DB
-        channels = await self.db_client.get_all_channels()
         channel_names = [c.name for c in channels]
         
         # If no channels yet, use defaults for first run
@@ -158,7 +198,6 @@ class KircApp(App):
         await channel_list.update_channels(channel_names, active_channel=self.current_channel)
 
         # Update Contacts from DB
-        contacts = await self.db_client.get_all_contacts()
         dm_list = self.query_one("#dm-list", DMList)
         
         contact_data = []
@@ -218,10 +257,12 @@ class KircApp(App):
                 topic_data_out=self.settings.kafka.topic_data_out,
                 topic_rpc_in=self.settings.kafka.topic_rpc_in,
                 topic_rpc_out=self.settings.kafka.topic_rpc_out,
+                rebalance_timeout_ms=self.settings.kafka.rebalance_timeout_ms,
             )
             # Register handlers
-            self.kafka_client.on_message(self.handle_incoming_message)
-            self.kafka_client.on_rpc(self.handle_rpc)
+            self.kafka_client.on_messages(self.handle_incoming_batch)
+            self.kafka_client.on_rpc(MessageType.FETCH_HISTORY, self.handle_fetch_history)
+            self.kafka_client.on_rpc(MessageType.CHANNEL_KEY_UPDATE, self.handle_channel_key_update)
             
             try:
                 await self.kafka_client.connect()
@@ -316,6 +357,7 @@ class KircApp(App):
 
             # Start Heartbeats
             self.set_interval(30.0, self.presence_heartbeat)
+            self.set_interval(DB_HEALTH_CHECK_INTERVAL, self.db_health_check)
             await self.presence_heartbeat() # Initial heartbeat
             
             # Subscribe to typing for current channel
@@ -329,77 +371,77 @@ class KircApp(App):
             status_bar.set_status("CONNECTION_FAILED", "red")
             self.notify(f"Connection Error: {str(e)}", severity="error")
 
-    async def handle_rpc(self, message) -> None:
-        """Handle incoming RPC messages."""
-        if message.type == "fetch_history":
-            channel = message.payload.get("channel")
-            limit = message.payload.get("limit", 50)
+    async def handle_fetch_history(self, message) -> None:
+        """Answer a peer's FETCH_HISTORY RPC with our stored channel history."""
+        channel = message.payload.get("channel")
+        limit = message.payload.get("limit", 50)
+
+        if self.db_client and channel:
+            messages = await self.db_client.get_messages(channel=channel, limit=limit)
+            messages_json = [m.model_dump(mode="json") for m in messages]
             
-            if self.db_client and channel:
-                messages = await self.db_client.get_messages(channel=channel, limit=limit)
-                messages_json = [m.model_dump(mode="json") for m in messages]
-                
-                payload = {"channel": channel}
-                
-                # Attempt to encrypt with requester's public key
-                contact = await self.db_client.get_contact(message.sender)
-                if contact and contact.public_key:
-                    try:
-                        import msgpack
-                        packed_data = msgpack.packb(messages_json)
-                        encrypted_data = encrypt_message(contact.public_key.encode(), packed_data)
-                        payload["encrypted_messages"] = base64.b64encode(encrypted_data).decode()
-                        payload["is_encrypted"] = True
-                    except Exception as e:
-                        self.notify(f"Failed to encrypt history for {message.sender}: {e}", severity="error")
-                        payload["messages"] = messages_json
-                        payload["is_encrypted"] = False
-                else:
-                    # Fallback to plaintext if no public key (with warning)
+            payload = {"channel": channel}
+            
+            # Attempt to encrypt with requester's public key
+            contact = await self.db_client.get_contact(message.sender)
+            if contact and contact.public_key:
+                try:
+                    import msgpack
+                    packed_data = msgpack.packb(messages_json)
+                    encrypted_data = encrypt_message(contact.public_key.encode(), packed_data)
+                    payload["encrypted_messages"] = base64.b64encode(encrypted_data).decode()
+                    payload["is_encrypted"] = True
+                except Exception as e:
+                    self.notify(f"Failed to encrypt history for {message.sender}: {e}", severity="error")
                     payload["messages"] = messages_json
                     payload["is_encrypted"] = False
+            else:
+                # Fallback to plaintext if no public key (with warning)
+                payload["messages"] = messages_json
+                payload["is_encrypted"] = False
 
-                # Send response
-                response = KircChatMessage(
-                    type="history_data",
-                    sender=self.settings.user_config.username,
-                    recipient=message.sender,
-                    correlation_id=message.correlation_id,
-                    payload=payload
-                )
-                
-                target_topic = f"rpc-in-{message.sender}"
-                await self.kafka_client.send_rpc(response, topic=target_topic)
-        
-        elif message.type == "channel_key_update":
-            if not self.private_key:
-                self.notify("Received channel key but no private key loaded!", severity="error")
-                return
+            # Send response
+            response = KafkaMessage(
+                type=MessageType.HISTORY_DATA,
+                sender=self.settings.user_config.username,
+                recipient=message.sender,
+                correlation_id=message.correlation_id,
+                payload=payload
+            )
+            
+            target_topic = f"rpc-in-{message.sender}"
+            await self.kafka_client.send_rpc(response, topic=target_topic)
 
-            try:
-                channel = message.payload.get("channel")
-                encrypted_key_b64 = message.payload.get("key")
-                key_id = message.payload.get("key_id")
-                encrypted_key = base64.b64decode(encrypted_key_b64)
-                
-                # Decrypt with our private key
-                symmetric_key = decrypt_message(self.private_key, encrypted_key)
-                
-                if channel not in self.channel_keys:
-                    self.channel_keys[channel] = {}
-                
-                if key_id:
-                    self.channel_keys[channel][key_id] = symmetric_key
-                    self.notify(f"Updated encryption key for #{channel} (ID: {key_id})")
-                    
-                    # Persist to local DB
-                    if self.db_client:
-                        await self.db_client.save_channel_key(channel, key_id, encrypted_key_b64)
-                else:
-                    self.notify("Received key update without ID", severity="warning")
+    async def handle_channel_key_update(self, message) -> None:
+        """Store a channel key a peer encrypted for us (CHANNEL_KEY_UPDATE RPC)."""
+        if not self.private_key:
+            self.notify("Received channel key but no private key loaded!", severity="error")
+            return
+
+        try:
+            channel = message.payload.get("channel")
+            encrypted_key_b64 = message.payload.get("key")
+            key_id = message.payload.get("key_id")
+            encrypted_key = base64.b64decode(encrypted_key_b64)
+            
+            # Decrypt with our private key
+            symmetric_key = decrypt_message(self.private_key, encrypted_key)
+            
+            if channel not in self.channel_keys:
+                self.channel_keys[channel] = {}
+            
+            if key_id:
+                self.channel_keys[channel][key_id] = symmetric_key
+                self.notify(f"Updated encryption key for #{channel} (ID: {key_id})")
                 
-            except Exception as e:
-                self.notify(f"Failed to decrypt channel key: {e}", severity="error")
+                # Persist to local DB
+                if self.db_client:
+                    await self.db_client.save_channel_key(channel, key_id, encrypted_key_b64)
+            else:
+                self.notify("Received key update without ID", severity="warning")
+            
+        except Exception as e:
+            self.notify(f"Failed to decrypt channel key: {e}", severity="error")
 
     async def fetch_channel_history(self, channel: str, leader: str) -> None:
         """Fetch history from channel leader."""
@@ -407,8 +449,8 @@ class KircApp(App):
             return
             
         try:
-            request = KircChatMessage(
-                type="fetch_history",
+            request = KafkaMessage(
+                type=MessageType.FETCH_HISTORY,
                 sender=self.settings.user_config.username,
                 recipient=leader,
                 payload={"channel": channel, "limit": 20}
@@ -417,7 +459,7 @@ class KircApp(App):
             target_topic = f"rpc-in-{leader}"
             response = await self.kafka_client.request(request, topic=target_topic, timeout=5.0)
             
-            if response.type == "history_data":
+            if response.type == MessageType.HISTORY_DATA:
                 is_encrypted = response.payload.get("is_encrypted", False)
                 messages_data = []
                 
@@ -447,9 +489,28 @@ class KircApp(App):
         except Exception as e:
             self.notify(f"Failed to fetch history: {e}", severity="error")
 
-    async def handle_incoming_message(self, message) -> None:
-        """Handle incoming Kafka messages."""
-        if message.type == "chat":
+    async def handle_incoming_batch(self, messages: list) -> None:
+        """Handle a polled batch of Kafka messages, persisting their history in one write."""
+        records = []
+        for message in messages:
+            try:
+                record = await self.handle_incoming_message(message)
+            except Exception:
+                self.logger.exception("Error handling message %s", message.id)
+                continue
+            if record is not None:
+                records.append(record)
+
+        if records and self.db_client:
+            try:
+                await self.db_client.save_messages(records)
+            except Exception:
+                self.logger.exception("Failed to persist %d messages", len(records))
+
+    async def handle_incoming_message(self, message) -> StoredMessage | None:
+        """Handle an incoming Kafka message; returns its history record, if any."""
+        record = None
+        if message.type == MessageType.CHAT:
             content = message.payload.get("content", "")
             channel = message.payload.get("channel")
             key_id = message.payload.get("key_id")
@@ -475,10 +536,10 @@ class KircApp(App):
                 except Exception:
                     content = "[ENCRYPTED_DATA_STREAM]"
             
-            # Save to DB (decrypted)
+            # Saved to DB (decrypted) by handle_incoming_batch
             if self.db_client:
                 message.payload["content"] = content
-                await self.db_client.save_message(message)
+                record = self._to_stored_message(message, content)
                 
             # Update UI if this message belongs to current channel
             if channel == self.current_channel:
@@ -520,6 +581,30 @@ class KircApp(App):
                         
                         await self.kafka_client.send_message(message)
                         # self.notify(f"Relayed message from {message.sender}")
+        return record
+
+    def _to_stored_message(self, message, content: str) -> StoredMessage:
+        """Convert an incoming Kafka message into its history record."""
+        return StoredMessage(
+            id=message.id,
+            message_type=MessageType(message.type).name.lower(),
+            sender=message.sender,
+            recipient=message.recipient,
+            channel=message.payload.get("channel"),
+            content=content.encode("utf-8"),
+            timestamp=message.timestamp,
+            is_outbound=message.sender == self.settings.user_config.username,
+            created_at=datetime.now(UTC),
+        )
+
+    async def db_health_check(self) -> None:
+        """Periodically ping the database pool so dead connections surface early."""
+        if self.db_client and not await self.db_client.health_check():
+            self.logger.warning("Database health check failed")
+
+    def on_unmount(self) -> None:
+        """Drain queued log records before exiting."""
+        self._log_listener.stop()
 
     def action_focus_input(self) -> None:
         """Focus the chat input."""
@@ -580,6 +665,7 @@ class KircApp(App):
         
         # Distribute to all members who are also contacts (need public key)
         count = 0
+        member_keys: dict[str, bytes] = {}
         for member_username in members:
             # Skip self
             if member_username == self.settings.user_config.username:
@@ -594,8 +680,8 @@ class KircApp(App):
                 encrypted_key = encrypt_message(contact.public_key.encode(), new_key)
                 encrypted_key_b64 = base64.b64encode(encrypted_key).decode()
                 
-                msg = KircChatMessage(
-                    type="channel_key_update",
+                msg = KafkaMessage(
+                    type=MessageType.CHANNEL_KEY_UPDATE,
                     sender=self.settings.user_config.username,
                     recipient=contact.username,
                     payload={
@@ -607,12 +693,13 @@ class KircApp(App):
                 
                 target_topic = f"rpc-in-{contact.username}"
                 await self.kafka_client.send_rpc(msg, topic=target_topic)
+                member_keys[contact.username] = encrypted_key
                 count += 1
             except Exception as e:
                 print(f"Failed to send key to {contact.username}: {e}")
         
-        # Signal rotation via Redis
-        await self.cache_client.publish_key_rotation(channel, key_id)
+        # Store member keys and signal rotation via Redis in one round trip
+        await self.cache_client.set_channel_keys_bulk(channel, member_keys, key_id=key_id)
         self.notify(f"Rotated keys for #{channel}. Sent to {count} users.")
 
     async def handle_key_rotation(self, channel: str, key_id: str) -> None:
@@ -683,9 +770,9 @@ class KircApp(App):
                     if leader != self.settings.user_config.username:
                          self.notify("WARNING: Transmitting unencrypted", severity="warning")
 
-                msg = KircChatMessage(
-                    sender=self.settings.user_config.username,
-                    content=final_content,
+                msg = chat_message(
+                    self.settings.user_config.username,
+                    final_content,
                     channel=channel,
                     payload={**payload_extras, "content": final_content, "channel": channel}
                 )
@@ -725,9 +812,7 @@ class KircApp(App):
         """Handle typing indicator updates."""
         if channel == self.current_channel and username != self.settings.user_config.username:
             indicator = self.query_one("#typing-indicator", TypingIndicator)
-            current_users = set(indicator.users)
             if is_typing:
-                current_users.add(username)
+                indicator.add_typist(username)
             else:
-                current_users.discard(username)
-            indicator.users = current_users
+                indicator.remove_typist(username)
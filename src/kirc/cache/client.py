@@ -1,6 +1,8 @@
 """Async Valkey/Redis client for pub/sub and caching."""
 
 import asyncio
+import functools
+import logging
 import time
 from collections.abc import Callable
 from typing import Any
@@ -8,23 +10,74 @@ from typing import Any
 import msgpack
 import valkey.asyncio as valkey
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on pooled sockets shared by all concurrent commands
+_MAX_CONNECTIONS = 32
+# Upper bound on pub/sub messages drained per event-loop turn
+_MAX_BATCH = 64
+# Keys inspected per SCAN round trip
+_SCAN_COUNT = 500
+
+
+@functools.lru_cache(maxsize=256)
+def _channel_key(channel: str, suffix: str) -> str:
+    """Build (and memoize) a ``channel:{channel}:{suffix}`` key.
+
+    Only for the fixed channel-scoped suffixes; per-user keys are formatted directly so they
+    don't evict channel keys from the cache.
+    """
+    return f"channel:{channel}:{suffix}"
+
+
+async def _run_handlers(kind: str, handlers: list[Callable[..., Any]], *args: Any) -> None:
+    """Call each handler with ``args``, then await the returned coroutines together.
+
+    A handler that raises is logged and skipped so the remaining handlers still run.
+    """
+    coros = []
+    for handler in handlers:
+        try:
+            result = handler(*args)
+        except Exception:
+            logger.exception("Error in %s handler", kind)
+            continue
+        if asyncio.iscoroutine(result):
+            coros.append(result)
+    if not coros:
+        return
+    for outcome in await asyncio.gather(*coros, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            logger.error("Error in %s handler", kind, exc_info=outcome)
+
 
 class CacheClient:
     """Async Valkey/Redis client for presence, typing indicators, and session cache.
 
     Uses Redis pub/sub for real-time notifications:
     - presence:{username} - Online/offline status
-    - typing:{channel} - Typing indicators per channel
+    - typing:{channel} - Typing indicators per channel (keys: typing:{{channel}}:{username})
     - notify:{username} - Direct notifications
+
+    Commands share a pre-sized connection pool, so concurrent ``publish``/``setex``
+    coroutines are multiplexed onto warm sockets instead of each paying for a new
+    connection handshake. The pub/sub subscription keeps its own dedicated connection.
     """
 
     def __init__(self, url: str, username: str) -> None:
         """Initialize with Valkey/Redis connection URL."""
         self._url = url
         self._username = username
+        self._presence_key = f"presence:{username}"
+        self._notify_channel = f"notify:{username}"
+        self._cache_prefix = f"cache:{username}:"
+        self._pool: valkey.ConnectionPool | None = None
         self._client: valkey.Valkey | None = None
         self._pubsub: valkey.client.PubSub | None = None
         self._running = False
+        self._last_presence: str | None = None
+        # (channel, monotonic time) of the last published is_typing=True, if still typing
+        self._last_typing: tuple[str, float] | None = None
         self._presence_handlers: list[Callable[[str, str], Any]] = []
         self._typing_handlers: list[Callable[[str, str, bool], Any]] = []
         self._notification_handlers: list[Callable[[dict], Any]] = []
@@ -33,12 +86,15 @@ class CacheClient:
 
     async def connect(self) -> None:
         """Connect to Valkey/Redis."""
-        self._client = valkey.from_url(self._url, decode_responses=False)
+        self._pool = valkey.ConnectionPool.from_url(
+            self._url, max_connections=_MAX_CONNECTIONS, decode_responses=False
+        )
+        self._client = valkey.Valkey(connection_pool=self._pool)
         self._pubsub = self._client.pubsub()
         self._running = True
 
         # Subscribe to our notification channel
-        await self._pubsub.subscribe(f"notify:{self._username}")
+        await self._pubsub.subscribe(self._notify_channel)
 
     async def disconnect(self) -> None:
         """Disconnect from Valkey/Redis."""
@@ -56,20 +112,31 @@ class CacheClient:
             await self._client.close()
             self._client = None
 
+        if self._pool:
+            await self._pool.disconnect()
+            self._pool = None
+
     # Presence
     async def set_presence(self, status: str, ttl_seconds: int = 300) -> None:
-        """Set user presence status with TTL."""
+        """Set user presence status with TTL; a repeated status only refreshes the TTL."""
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"presence:{self._username}"
-        await self._client.setex(key, ttl_seconds, status.encode())
+        key = self._presence_key
 
-        # Publish presence change
-        await self._client.publish(
-            f"presence:{self._username}",
-            msgpack.packb({"username": self._username, "status": status}),
-        )
+        # Unchanged status (e.g. heartbeat): only extend the TTL, don't wake subscribers
+        if status == self._last_presence and await self._client.expire(key, ttl_seconds):
+            return
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.setex(key, ttl_seconds, status.encode())
+            # Publish presence change
+            pipe.publish(
+                self._presence_key,
+                msgpack.packb({"username": self._username, "status": status}),
+            )
+            await pipe.execute()
+        self._last_presence = status
 
     async def get_presence(self, username: str) -> str:
         """Get user presence status."""
@@ -85,7 +152,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"presence:{self._username}"
+        key = self._presence_key
         await self._client.expire(key, ttl_seconds)
 
     def on_presence(self, handler: Callable[[str, str], Any]) -> None:
@@ -94,11 +161,23 @@ class CacheClient:
 
     # Typing Indicators
     async def set_typing(self, channel: str, is_typing: bool = True, ttl_seconds: int = 5) -> None:
-        """Set typing indicator for a channel."""
+        """Set typing indicator for a channel; repeats within TTL/2 are not re-published."""
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"typing:{channel}:{self._username}"
+        # {channel} is a hash tag: all typing keys for a channel share one cluster slot
+        key = f"typing:{{{channel}}}:{self._username}"
+
+        # Sustained typing re-sends True on every keystroke; skip it while the key is still fresh.
+        # Only the current channel is remembered, and stopping always publishes.
+        if is_typing:
+            now = time.monotonic()
+            last = self._last_typing
+            if last and last[0] == channel and now - last[1] < ttl_seconds / 2:
+                return
+            self._last_typing = (channel, now)
+        elif self._last_typing and self._last_typing[0] == channel:
+            self._last_typing = None
 
         if is_typing:
             await self._client.setex(key, ttl_seconds, b"1")
@@ -118,21 +197,29 @@ class CacheClient:
         )
 
     async def get_typing_users(self, channel: str) -> list[str]:
-        """Get list of users currently typing in a channel."""
+        """Get list of users currently typing in a channel.
+
+        Uses incremental SCAN rather than KEYS so the server is never blocked, which
+        means results on a large keyspace take several round trips and reflect keys
+        as they were while the scan progressed.
+        """
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        pattern = f"typing:{channel}:*"
-        keys = await self._client.keys(pattern)
-
-        users = []
-        for key in keys:
-            # Extract username from key
-            key_str = key.decode() if isinstance(key, bytes) else key
-            username = key_str.split(":")[-1]
-            users.append(username)
+        pattern = f"typing:{{{channel}}}:*"
+        # SCAN may return the same key more than once
+        users: set[str] = set()
+        cursor = 0
+        while True:
+            cursor, keys = await self._client.scan(cursor=cursor, match=pattern, count=_SCAN_COUNT)
+            for key in keys:
+                # Extract username from key
+                key_str = key.decode() if isinstance(key, bytes) else key
+                users.add(key_str.rsplit(":", 1)[-1])
+            if cursor == 0:
+                break
 
-        return users
+        return list(users)
 
     def on_typing(self, handler: Callable[[str, str, bool], Any]) -> None:
         """Register handler for typing changes. Handler receives (channel, username, is_typing)."""
@@ -185,14 +272,14 @@ class CacheClient:
             raise RuntimeError("Cache client not connected")
 
         packed = msgpack.packb(value)
-        await self._client.setex(f"cache:{self._username}:{key}", ttl_seconds, packed)
+        await self._client.setex(self._cache_prefix + key, ttl_seconds, packed)
 
     async def cache_get(self, key: str) -> Any | None:
         """Get a cached value."""
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        data = await self._client.get(f"cache:{self._username}:{key}")
+        data = await self._client.get(self._cache_prefix + key)
         if data:
             return msgpack.unpackb(data, raw=False)
         return None
@@ -202,7 +289,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        await self._client.delete(f"cache:{self._username}:{key}")
+        await self._client.delete(self._cache_prefix + key)
 
     # Channel Leadership
     async def register_channel_leader(self, channel: str, ttl_seconds: int = 300) -> bool:
@@ -210,7 +297,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"channel:{channel}:leader"
+        key = _channel_key(channel, "leader")
         # NX=True means only set if not exists
         success = await self._client.set(key, self._username, ex=ttl_seconds, nx=True)
         
@@ -228,7 +315,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"channel:{channel}:leader"
+        key = _channel_key(channel, "leader")
         leader = await self._client.get(key)
         return leader.decode() if leader else None
 
@@ -237,7 +324,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"channel:{channel}:leader"
+        key = _channel_key(channel, "leader")
         # Only delete if we are the leader
         current_leader = await self._client.get(key)
         if current_leader and current_leader.decode() == self._username:
@@ -249,7 +336,6 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
             
-        key = f"channel:{channel}:keys"
         # We use a hash where field is username and value is the encrypted key
         # But to support TTL, maybe we should use separate keys?
         # Redis Hashes don't support TTL per field.
@@ -258,6 +344,27 @@ class CacheClient:
         user_key_path = f"channel:{channel}:key:{username}"
         await self._client.setex(user_key_path, ttl_seconds, encrypted_key)
 
+    async def set_channel_keys_bulk(
+        self,
+        channel: str,
+        user_keys: dict[str, bytes],
+        key_id: str | None = None,
+        ttl_seconds: int = 86400,
+    ) -> None:
+        """Store encrypted channel keys for many users in a single round trip.
+
+        If key_id is given, the key rotation signal is published in the same pipeline.
+        """
+        if not self._client:
+            raise RuntimeError("Cache client not connected")
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            for username, encrypted_key in user_keys.items():
+                pipe.setex(f"channel:{channel}:key:{username}", ttl_seconds, encrypted_key)
+            if key_id is not None:
+                pipe.publish(f"rotation:{channel}", self._pack_rotation(channel, key_id, None))
+            await pipe.execute()
+
     async def get_channel_key(self, channel: str) -> bytes | None:
         """Get the encrypted channel key for the current user."""
         if not self._client:
@@ -275,14 +382,19 @@ class CacheClient:
 
         await self._client.publish(
             f"rotation:{channel}",
-            msgpack.packb({
-                "channel": channel,
-                "key_id": key_id,
-                "start_message_id": start_message_id,
-                "timestamp": time.time()
-            })
+            self._pack_rotation(channel, key_id, start_message_id),
         )
 
+    @staticmethod
+    def _pack_rotation(channel: str, key_id: str, start_message_id: str | None) -> bytes:
+        """Build the key rotation signal payload."""
+        return msgpack.packb({
+            "channel": channel,
+            "key_id": key_id,
+            "start_message_id": start_message_id,
+            "timestamp": time.time()
+        })
+
     def on_key_rotation(self, handler: Callable[[dict], Any]) -> None:
         """Register handler for key rotation signals."""
         self._rotation_handlers.append(handler)
@@ -299,7 +411,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"channel:{channel}:status"
+        key = _channel_key(channel, "status")
         # Store as hash for easier field updates if needed, or just msgpack blob
         # Using msgpack blob for simplicity with setex
         await self._client.setex(key, ttl_seconds, msgpack.packb(status))
@@ -309,7 +421,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
 
-        key = f"channel:{channel}:status"
+        key = _channel_key(channel, "status")
         data = await self._client.get(key)
         if data:
             return msgpack.unpackb(data, raw=False)
@@ -321,7 +433,7 @@ class CacheClient:
             raise RuntimeError("Cache client not connected")
 
         await self._client.publish(
-            f"channel:{channel}:events",
+            _channel_key(channel, "events"),
             msgpack.packb({
                 "type": event_type,
                 "payload": payload,
@@ -333,7 +445,7 @@ class CacheClient:
         """Subscribe to channel control plane events."""
         if not self._pubsub:
             raise RuntimeError("Cache client not connected")
-        await self._pubsub.subscribe(f"channel:{channel}:events")
+        await self._pubsub.subscribe(_channel_key(channel, "events"))
 
     def on_channel_event(self, handler: Callable[[str, dict], Any]) -> None:
         """Register handler for channel events. Handler receives (channel, event_data)."""
@@ -345,7 +457,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
         
-        key = f"channel:{channel}:members"
+        key = _channel_key(channel, "members")
         await self._client.sadd(key, self._username)
         # Publish join event
         await self.publish_channel_event(channel, "join", {"username": self._username})
@@ -355,7 +467,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
             
-        key = f"channel:{channel}:members"
+        key = _channel_key(channel, "members")
         await self._client.srem(key, self._username)
         # Publish leave event
         await self.publish_channel_event(channel, "leave", {"username": self._username})
@@ -365,7 +477,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
             
-        key = f"channel:{channel}:members"
+        key = _channel_key(channel, "members")
         members = await self._client.smembers(key)
         return [m.decode() for m in members]
 
@@ -374,7 +486,7 @@ class CacheClient:
         if not self._client:
             raise RuntimeError("Cache client not connected")
             
-        key = f"channel:{channel}:members"
+        key = _channel_key(channel, "members")
         await self._client.srem(key, username)
         # Publish kick event
         await self.publish_channel_event(channel, "kick", {"username": username})
@@ -397,13 +509,8 @@ class CacheClient:
                 return
 
         if channel.startswith("presence:"):
-            for handler in self._presence_handlers:
-                try:
-                    result = handler(data.get("username"), data.get("status"))
-                    if asyncio.iscoroutine(result):
-                        await result
-                except Exception as e:
-                    print(f"Error in presence handler: {e}")
+            username, status = data.get("username"), data.get("status")
+            await _run_handlers("presence", self._presence_handlers, username, status)
 
         elif channel.startswith("typing:"):
             # typing:{channel}
@@ -439,16 +546,39 @@ class CacheClient:
                         handler(chan_name, data)
 
         elif channel.startswith("notify:"):
-            for handler in self._notification_handlers:
-                try:
-                    result = handler(data)
-                    if asyncio.iscoroutine(result):
-                        await result
-                except Exception as e:
-                    print(f"Error in notification handler: {e}")
+            await _run_handlers("notification", self._notification_handlers, data)
+
+    async def _handle_channel_batch(self, messages: list[dict]) -> None:
+        """Handle messages from a single pub/sub channel in arrival order.
+
+        A failing message is logged and skipped so it doesn't drop the rest of the batch.
+        """
+        for message in messages:
+            try:
+                await self._handle_message(message)
+            except Exception:
+                logger.exception("Error handling pub/sub message")
+
+    async def _handle_batch(self, batch: list[dict]) -> None:
+        """Handle a drained batch, overlapping channels but keeping per-channel order."""
+        by_channel: dict[Any, list[dict]] = {}
+        for message in batch:
+            by_channel.setdefault(message.get("channel"), []).append(message)
+
+        if len(by_channel) == 1:
+            await self._handle_channel_batch(batch)
+            return
+
+        await asyncio.gather(
+            *(self._handle_channel_batch(messages) for messages in by_channel.values())
+        )
 
     async def run(self) -> None:
-        """Run the pub/sub message loop."""
+        """Run the pub/sub message loop.
+
+        After each blocking read, messages already buffered on the connection are
+        drained (up to ``_MAX_BATCH``) and handled as one batch.
+        """
         if not self._pubsub:
             raise RuntimeError("Cache client not connected")
 
@@ -458,13 +588,30 @@ class CacheClient:
                     ignore_subscribe_messages=True,
                     timeout=1.0,
                 )
-                if message:
-                    await self._handle_message(message)
+                if not message:
+                    continue
+
+                batch = [message]
+                while len(batch) < _MAX_BATCH:
+                    message = await self._pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=0.0,
+                    )
+                    if not message:
+                        break
+                    batch.append(message)
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                print(f"Error in pub/sub loop: {e}")
+            except Exception:
+                logger.exception("Error in pub/sub loop")
                 await asyncio.sleep(1)
+                continue
+
+            # Handler errors are logged per message, so they don't stall the read loop
+            try:
+                await self._handle_batch(batch)
+            except asyncio.CancelledError:
+                break
 
     async def __aenter__(self) -> "CacheClient":
         await self.connect()
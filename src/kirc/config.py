@@ -1,5 +1,7 @@
 """Configuration management using pydantic-settings."""
 
+import functools
+
 from pydantic import Field, BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,6 +22,9 @@ class KafkaSettings(BaseModel):
     topic_rpc_in: str = "rpc-in"
     topic_rpc_out: str = "rpc-out"
 
+    # Upper bound on a consumer group rebalance (KAFKA__REBALANCE_TIMEOUT_MS)
+    rebalance_timeout_ms: int = 60000
+
 
 class PostgresSettings(BaseModel):
     """PostgreSQL connection settings."""
@@ -46,6 +51,7 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
         env_nested_delimiter="__",
         extra="ignore",
+        frozen=True,
     )
 
     kafka: KafkaSettings = Field(default_factory=KafkaSettings)
@@ -54,6 +60,7 @@ class Settings(BaseSettings):
     user_config: UserSettings = Field(default_factory=UserSettings)
 
 
+@functools.lru_cache(maxsize=1)
 def load_settings() -> Settings:
-    """Load settings from environment and .env file."""
+    """Load settings from environment and .env file (parsed once per process)."""
     return Settings()
@@ -1,12 +1,16 @@
 """Cryptography utilities for K-IRC."""
 
+import asyncio
 import base64
+import os
 from pathlib import Path
 from typing import Tuple
 
+from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 
 def generate_key_pair() -> Tuple[bytes, bytes]:
@@ -97,20 +101,73 @@ def load_key_from_file(path: str) -> bytes:
     return Path(path).read_bytes()
 
 
-from cryptography.fernet import Fernet
+_AES_KEY_SIZE = 32
+_NONCE_SIZE = 12
+
+
+def _is_legacy_key(key: bytes) -> bool:
+    """Return True for Fernet keys (44-byte base64) rather than raw 32-byte AES keys."""
+    return len(key) != _AES_KEY_SIZE
+
 
 def generate_symmetric_key() -> bytes:
-    """Generate a symmetric key (Fernet)."""
-    return Fernet.generate_key()
+    """Generate a symmetric key (AES-256-GCM)."""
+    return AESGCM.generate_key(bit_length=256)
 
 
 def encrypt_symmetric(key: bytes, message: str) -> bytes:
-    """Encrypt a string message using a symmetric key."""
-    f = Fernet(key)
-    return f.encrypt(message.encode())
+    """Encrypt a string message using a symmetric key.
+
+    Returns ``nonce || ciphertext || tag``. Legacy Fernet keys still produce Fernet tokens
+    so channels keyed before the switch to AES-GCM keep working until their next rotation.
+    """
+    if _is_legacy_key(key):
+        return Fernet(key).encrypt(message.encode())
+    nonce = os.urandom(_NONCE_SIZE)
+    return nonce + AESGCM(key).encrypt(nonce, message.encode(), None)
 
 
 def decrypt_symmetric(key: bytes, ciphertext: bytes) -> str:
-    """Decrypt a message using a symmetric key."""
-    f = Fernet(key)
-    return f.decrypt(ciphertext).decode()
+    """Decrypt a message using a symmetric key (AES-GCM, or Fernet for legacy keys)."""
+    if _is_legacy_key(key):
+        return Fernet(key).decrypt(ciphertext).decode()
+    return AESGCM(key).decrypt(ciphertext[:_NONCE_SIZE], ciphertext[_NONCE_SIZE:], None).decode()
+
+
+async def generate_key_pair_async() -> Tuple[bytes, bytes]:
+    """Generate a new RSA key pair in a worker thread.
+
+    Key generation is CPU-bound and would otherwise stall the event loop.
+
+    Returns:
+        Tuple[bytes, bytes]: (private_key_pem, public_key_pem)
+    """
+    return await asyncio.to_thread(generate_key_pair)
+
+
+async def encrypt_message_async(public_key_pem: bytes, message: bytes) -> bytes:
+    """Encrypt a message using a public key, off the event loop.
+
+    OpenSSL releases the GIL, so concurrent calls run in parallel.
+
+    Args:
+        public_key_pem: The recipient's public key in PEM format.
+        message: The message to encrypt.
+
+    Returns:
+        bytes: The encrypted message.
+    """
+    return await asyncio.to_thread(encrypt_message, public_key_pem, message)
+
+
+async def decrypt_message_async(private_key_pem: bytes, ciphertext: bytes) -> bytes:
+    """Decrypt a message using a private key, off the event loop.
+
+    Args:
+        private_key_pem: The recipient's private key in PEM format.
+        ciphertext: The encrypted message.
+
+    Returns:
+        bytes: The decrypted message.
+    """
+    return await asyncio.to_thread(decrypt_message, private_key_pem, ciphertext)
@@ -1,15 +1,323 @@
 """Async PostgreSQL client using asyncpg."""
 
+import contextlib
+import copy
+import hashlib
+import logging
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Final
 from uuid import UUID, uuid4
 
 import asyncpg
 import msgpack
+import orjson
 
 from kirc.db.models import Channel, Contact, Message, ServiceConfig, ServiceType, UserProfile
 
+logger = logging.getLogger(__name__)
+
+# Explicit column lists (matching model field names) so rows can be mapped positionally
+_SERVICE_CONFIG_COLUMNS = (
+    "id", "service_type", "name", "host", "port", "username", "password",
+    "ssl_enabled", "ssl_ca_cert", "ssl_client_cert", "ssl_client_key",
+    "extra_config", "created_at", "updated_at",
+)
+_USER_PROFILE_COLUMNS = (
+    "id", "username", "display_name", "public_key", "avatar_url", "status", "bio",
+    "is_public", "quota_bytes_per_day", "created_at", "updated_at",
+)
+_CONTACT_COLUMNS = (
+    "id", "username", "display_name", "kafka_bootstrap_servers", "public_key", "notes",
+    "is_blocked", "last_seen", "created_at", "updated_at",
+)
+# List views skip the heavy columns (cert PEMs, credentials, notes); fetch those per row
+_SERVICE_CONFIG_SUMMARY_COLUMNS = (
+    "id", "service_type", "name", "host", "port", "ssl_enabled", "created_at", "updated_at",
+)
+_CONTACT_LIST_COLUMNS = tuple(c for c in _CONTACT_COLUMNS if c != "notes")
+_CHANNEL_COLUMNS = ("name", "description", "is_joined", "created_at", "updated_at")
+_MESSAGE_COLUMNS = (
+    "id", "message_type", "sender", "recipient", "channel", "content", "timestamp",
+    "is_outbound", "is_read", "created_at",
+)
+
+_SERVICE_CONFIG_SELECT = ", ".join(_SERVICE_CONFIG_COLUMNS)
+_USER_PROFILE_SELECT = ", ".join(_USER_PROFILE_COLUMNS)
+_CONTACT_SELECT = ", ".join(_CONTACT_COLUMNS)
+_CHANNEL_SELECT = ", ".join(_CHANNEL_COLUMNS)
+_MESSAGE_SELECT = ", ".join(_MESSAGE_COLUMNS)
+_SERVICE_CONFIG_SUMMARY_SELECT = ", ".join(_SERVICE_CONFIG_SUMMARY_COLUMNS)
+_CONTACT_LIST_SELECT = ", ".join(_CONTACT_LIST_COLUMNS)
+# Same shape as _MESSAGE_SELECT, but ships an empty payload instead of the content blob
+_MESSAGE_METADATA_SELECT = ", ".join(
+    "''::bytea AS content" if c == "content" else c for c in _MESSAGE_COLUMNS
+)
+
+# SQL is hoisted to module constants so every call sends byte-identical text and hits
+# asyncpg's per-connection prepared statement cache (keyed by query string).
+_SQL_SAVE_SERVICE_CONFIG: Final[str] = """
+    INSERT INTO service_configs
+        (id, service_type, name, host, port, username, password,
+         ssl_enabled, ssl_ca_cert, ssl_client_cert, ssl_client_key,
+         extra_config, created_at, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+    ON CONFLICT (id) DO UPDATE SET
+        service_type = EXCLUDED.service_type,
+        name = EXCLUDED.name,
+        host = EXCLUDED.host,
+        port = EXCLUDED.port,
+        username = EXCLUDED.username,
+        password = EXCLUDED.password,
+        ssl_enabled = EXCLUDED.ssl_enabled,
+        ssl_ca_cert = EXCLUDED.ssl_ca_cert,
+        ssl_client_cert = EXCLUDED.ssl_client_cert,
+        ssl_client_key = EXCLUDED.ssl_client_key,
+        extra_config = EXCLUDED.extra_config,
+        updated_at = NOW()
+    RETURNING updated_at
+"""
+_SQL_GET_SERVICE_CONFIG: Final[str] = (
+    f"SELECT {_SERVICE_CONFIG_SELECT} FROM service_configs WHERE service_type = $1"
+)
+_SQL_GET_SERVICE_CONFIG_BY_ID: Final[str] = (
+    f"SELECT {_SERVICE_CONFIG_SELECT} FROM service_configs WHERE id = $1"
+)
+_SQL_GET_ALL_SERVICE_CONFIGS: Final[str] = (
+    f"SELECT {_SERVICE_CONFIG_SUMMARY_SELECT} FROM service_configs"
+)
+
+_SQL_SAVE_USER_PROFILE: Final[str] = """
+    INSERT INTO user_profiles
+        (id, username, display_name, public_key, avatar_url,
+         status, bio, is_public, quota_bytes_per_day, created_at, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+    ON CONFLICT (username) DO UPDATE SET
+        display_name = EXCLUDED.display_name,
+        public_key = EXCLUDED.public_key,
+        avatar_url = EXCLUDED.avatar_url,
+        status = EXCLUDED.status,
+        bio = EXCLUDED.bio,
+        is_public = EXCLUDED.is_public,
+        quota_bytes_per_day = EXCLUDED.quota_bytes_per_day,
+        updated_at = NOW()
+    RETURNING updated_at
+"""
+_SQL_GET_USER_PROFILE: Final[str] = f"SELECT {_USER_PROFILE_SELECT} FROM user_profiles LIMIT 1"
+
+_SQL_SAVE_CONTACT: Final[str] = """
+    INSERT INTO contacts
+        (id, username, display_name, kafka_bootstrap_servers,
+         public_key, notes, is_blocked, last_seen, created_at, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (username) DO UPDATE SET
+        display_name = EXCLUDED.display_name,
+        kafka_bootstrap_servers = EXCLUDED.kafka_bootstrap_servers,
+        public_key = EXCLUDED.public_key,
+        notes = EXCLUDED.notes,
+        is_blocked = EXCLUDED.is_blocked,
+        last_seen = EXCLUDED.last_seen,
+        updated_at = NOW()
+    RETURNING updated_at
+"""
+_SQL_GET_CONTACT: Final[str] = f"SELECT {_CONTACT_SELECT} FROM contacts WHERE username = $1"
+_SQL_GET_ALL_CONTACTS: Final[str] = (
+    f"SELECT {_CONTACT_LIST_SELECT} FROM contacts ORDER BY username"
+)
+_SQL_GET_UNBLOCKED_CONTACTS: Final[str] = (
+    f"SELECT {_CONTACT_LIST_SELECT} FROM contacts WHERE is_blocked = FALSE ORDER BY username"
+)
+_SQL_DELETE_CONTACT: Final[str] = "DELETE FROM contacts WHERE username = $1"
+
+_SQL_SAVE_CHANNEL: Final[str] = """
+    INSERT INTO channels
+        (name, description, is_joined, created_at, updated_at)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (name) DO UPDATE SET
+        description = EXCLUDED.description,
+        is_joined = EXCLUDED.is_joined,
+        updated_at = NOW()
+    RETURNING updated_at
+"""
+_SQL_GET_CHANNEL: Final[str] = f"SELECT {_CHANNEL_SELECT} FROM channels WHERE name = $1"
+_SQL_GET_JOINED_CHANNELS: Final[str] = (
+    f"SELECT {_CHANNEL_SELECT} FROM channels WHERE is_joined = TRUE ORDER BY name"
+)
+_SQL_GET_ALL_CHANNELS: Final[str] = f"SELECT {_CHANNEL_SELECT} FROM channels ORDER BY name"
+_SQL_DELETE_CHANNEL: Final[str] = "DELETE FROM channels WHERE name = $1"
+
+_SQL_SAVE_MESSAGE: Final[str] = """
+    INSERT INTO messages
+        (id, message_type, sender, recipient, channel,
+         content, timestamp, is_outbound, is_read, created_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+"""
+
+
+def _message_queries(where: str, limit: str) -> tuple[str, str]:
+    """Build the (full, metadata-only) pair of get_messages() statements for one filter."""
+    order = f"ORDER BY timestamp DESC, id DESC LIMIT {limit}"
+    tail = " ".join(filter(None, ("FROM messages", where, order)))
+    return f"SELECT {_MESSAGE_SELECT} {tail}", f"SELECT {_MESSAGE_METADATA_SELECT} {tail}"
+
+
+# Hash of the last schema.sql applied, persisted as a database-level setting so unchanged
+# schemas are not re-sent on every startup. ALTER DATABASE takes no bind parameters, so the
+# statements are built server-side with format().
+_SQL_GET_SCHEMA_SHA: Final[str] = "SELECT current_setting('kirc.schema_sha', true)"
+_SQL_FORMAT_SET_SCHEMA_SHA: Final[str] = (
+    "SELECT format('ALTER DATABASE %I SET kirc.schema_sha = %L', current_database(), $1)"
+)
+_SQL_FORMAT_RESET_SCHEMA_SHA: Final[str] = (
+    "SELECT format('ALTER DATABASE %I RESET kirc.schema_sha', current_database())"
+)
+
+# Bulk import: COPY into a transaction-scoped staging table, then merge skipping duplicates
+_SQL_CREATE_MESSAGE_STAGING: Final[str] = (
+    "CREATE TEMP TABLE _messages_import (LIKE messages INCLUDING DEFAULTS) ON COMMIT DROP"
+)
+_SQL_MERGE_MESSAGE_STAGING: Final[str] = (
+    f"INSERT INTO messages ({_MESSAGE_SELECT}) "
+    f"SELECT {_MESSAGE_SELECT} FROM _messages_import ON CONFLICT (id) DO NOTHING"
+)
+
+# One fixed statement pair per get_messages() filter shape, keyed by
+# (by_channel, by_contact, has_before). Parameters are always
+# [filter value], [before timestamp, before id], limit.
+_MESSAGE_CONTACT_FILTER = (
+    "((sender = $1 AND is_outbound = FALSE) OR (recipient = $1 AND is_outbound = TRUE))"
+)
+_SQL_GET_MESSAGES: Final[dict[tuple[bool, bool, bool], tuple[str, str]]] = {
+    (True, False, False): _message_queries("WHERE channel = $1", "$2"),
+    (True, False, True): _message_queries(
+        "WHERE channel = $1 AND (timestamp, id) < ($2, $3)", "$4"
+    ),
+    (False, True, False): _message_queries(f"WHERE {_MESSAGE_CONTACT_FILTER}", "$2"),
+    (False, True, True): _message_queries(
+        f"WHERE {_MESSAGE_CONTACT_FILTER} AND (timestamp, id) < ($2, $3)", "$4"
+    ),
+    (False, False, False): _message_queries("", "$1"),
+    (False, False, True): _message_queries("WHERE (timestamp, id) < ($1, $2)", "$3"),
+}
+# NULL parameters disable their filter, so one prepared statement covers every case
+_SQL_MARK_READ: Final[str] = """
+    UPDATE messages SET is_read = TRUE
+    WHERE is_read = FALSE
+      AND ($1::text IS NULL OR channel = $1)
+      AND ($2::text IS NULL OR sender = $2)
+"""
+
+_SQL_SAVE_CHANNEL_KEY: Final[str] = """
+    INSERT INTO channel_keys (channel_name, key_id, encrypted_key)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (channel_name, key_id) DO UPDATE SET
+        encrypted_key = EXCLUDED.encrypted_key
+"""
+_SQL_GET_CHANNEL_KEYS: Final[str] = (
+    "SELECT key_id, encrypted_key FROM channel_keys WHERE channel_name = $1"
+)
+
+# Prepared statements kept per pooled connection; well above the number of distinct queries
+_STATEMENT_CACHE_SIZE = 1024
+
+# Pool sizing for the mixed Kafka-consumer / UI workload. asyncpg hands out the most
+# recently released connection first (LIFO), so hot connections keep warm caches while
+# idle ones age out after max_inactive_connection_lifetime.
+_POOL_MIN_SIZE = 4
+_POOL_MAX_SIZE = 32
+_POOL_MAX_QUERIES = 50_000
+_POOL_MAX_INACTIVE_LIFETIME = 300.0
+
+
+# jsonb's binary wire format is a version byte followed by the JSON text
+_JSONB_VERSION = b"\x01"
+
+
+def _jsonb_encode(value: Any) -> bytes:
+    """Encode a value as a binary jsonb parameter."""
+    return _JSONB_VERSION + orjson.dumps(value)
+
+
+def _jsonb_decode(data: bytes) -> Any:
+    """Decode a binary jsonb column, skipping the version byte without copying."""
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Per-connection session setup run once when the pool opens a connection."""
+    # asyncpg ships json/jsonb as raw text; decode/encode with orjson over the binary
+    # protocol so columns like extra_config round-trip as dicts. uuid, timestamptz and bytea
+    # already use asyncpg's built-in binary C codecs, which are faster than any Python
+    # replacement.
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_jsonb_encode,
+        decoder=_jsonb_decode,
+        schema="pg_catalog",
+        format="binary",
+    )
+    # Binary json is plain JSON text, so orjson's bytes work unchanged
+    await conn.set_type_codec(
+        "json", encoder=orjson.dumps, decoder=orjson.loads, schema="pg_catalog", format="binary"
+    )
+
+
+def _message_values(message: Message) -> tuple[Any, ...]:
+    """Positional parameters for _SQL_SAVE_MESSAGE."""
+    return (
+        message.id,
+        message.message_type,
+        message.sender,
+        message.recipient,
+        message.channel,
+        message.content,
+        message.timestamp,
+        message.is_outbound,
+        message.is_read,
+        message.created_at,
+    )
+
+
+def _row_count(status: str) -> int:
+    """Row count from a command tag such as "UPDATE 3" or "INSERT 0 3"."""
+    # The count is always the last token; rpartition avoids split()'s list allocation
+    return int(status.rpartition(" ")[2]) if status else 0
+
+
+def _service_config_from_row(
+    row: asyncpg.Record, columns: tuple[str, ...] = _SERVICE_CONFIG_COLUMNS
+) -> ServiceConfig:
+    """Build a ServiceConfig from a row; DB data is trusted, so validation is skipped."""
+    fields = dict(zip(columns, row, strict=True))
+    fields["service_type"] = ServiceType(fields["service_type"])
+    return ServiceConfig.model_construct(**fields)
+
+
+def _user_profile_from_row(row: asyncpg.Record) -> UserProfile:
+    """Build a UserProfile from a row without re-validating it."""
+    return UserProfile.model_construct(**dict(zip(_USER_PROFILE_COLUMNS, row, strict=True)))
+
+
+def _contact_from_row(
+    row: asyncpg.Record, columns: tuple[str, ...] = _CONTACT_COLUMNS
+) -> Contact:
+    """Build a Contact from a row without re-validating it."""
+    return Contact.model_construct(**dict(zip(columns, row, strict=True)))
+
+
+def _channel_from_row(row: asyncpg.Record) -> Channel:
+    """Build a Channel from a row without re-validating it."""
+    return Channel.model_construct(**dict(zip(_CHANNEL_COLUMNS, row, strict=True)))
+
+
+def _message_from_row(row: asyncpg.Record) -> Message:
+    """Build a Message from a row without re-validating it."""
+    return Message.model_construct(**dict(zip(_MESSAGE_COLUMNS, row, strict=True)))
+
 
 class DatabaseClient:
     """Async PostgreSQL client for K-IRC data storage."""
@@ -18,10 +326,20 @@ class DatabaseClient:
         """Initialize with PostgreSQL connection string."""
         self._dsn = dsn
         self._pool: asyncpg.Pool | None = None
+        # Set on clients returned by session(); every query then reuses this connection
+        self._conn: asyncpg.Connection | None = None
 
     async def connect(self) -> None:
         """Create connection pool."""
-        self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=10)
+        self._pool = await asyncpg.create_pool(
+            self._dsn,
+            min_size=_POOL_MIN_SIZE,
+            max_size=_POOL_MAX_SIZE,
+            max_queries=_POOL_MAX_QUERIES,
+            max_inactive_connection_lifetime=_POOL_MAX_INACTIVE_LIFETIME,
+            statement_cache_size=_STATEMENT_CACHE_SIZE,
+            init=_init_connection,
+        )
 
     async def disconnect(self) -> None:
         """Close connection pool."""
@@ -29,39 +347,67 @@ class DatabaseClient:
             await self._pool.close()
             self._pool = None
 
-    async def initialize_schema(self) -> None:
-        """Create database tables if they don't exist."""
-        schema_path = Path(__file__).parent / "schema.sql"
-        schema_sql = schema_path.read_text()
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Yield the pinned session connection, or borrow one from the pool."""
+        if self._conn is not None:
+            yield self._conn
+            return
+        async with self._pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["DatabaseClient"]:
+        """Acquire one connection for a burst of queries.
 
+        Usage: ``async with db.session() as s: await s.get_all_channels()``
+        """
+        if self._conn is not None:
+            yield self
+            return
         async with self._pool.acquire() as conn:
-            await conn.execute(schema_sql)
+            pinned = copy.copy(self)
+            pinned._conn = conn
+            yield pinned
+
+    async def health_check(self) -> bool:
+        """Ping the pool; returns False if the database is unreachable."""
+        if not self._pool:
+            return False
+        try:
+            async with self._acquire() as conn:
+                return await conn.fetchval("SELECT 1") == 1
+        except (OSError, asyncpg.PostgresError):
+            return False
+
+    async def initialize_schema(self) -> None:
+        """Create database tables if they don't exist, skipping an unchanged schema."""
+        schema_path = Path(__file__).parent / "schema.sql"
+        schema_bytes = schema_path.read_bytes()
+        schema_sha = hashlib.sha256(schema_bytes).hexdigest()
+
+        async with self._acquire() as conn:
+            if await conn.fetchval(_SQL_GET_SCHEMA_SHA) == schema_sha:
+                return
+            await conn.execute(schema_bytes.decode("utf-8"))
+            try:
+                await conn.execute(await conn.fetchval(_SQL_FORMAT_SET_SCHEMA_SHA, schema_sha))
+            except asyncpg.InsufficientPrivilegeError:
+                # Not the database owner; the schema is idempotent, so just re-run it next time
+                logger.warning("Could not store schema hash; schema will be re-applied next start")
+
+    async def reset_schema_hash(self) -> None:
+        """Forget the applied schema hash so the next initialize_schema() re-runs it."""
+        async with self._acquire() as conn:
+            with contextlib.suppress(asyncpg.InsufficientPrivilegeError):
+                await conn.execute(await conn.fetchval(_SQL_FORMAT_RESET_SCHEMA_SHA))
 
     # Service Configs
     async def save_service_config(self, config: ServiceConfig) -> ServiceConfig:
         """Insert or update a service configuration."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO service_configs
-                    (id, service_type, name, host, port, username, password,
-                     ssl_enabled, ssl_ca_cert, ssl_client_cert, ssl_client_key,
-                     extra_config, created_at, updated_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
-                ON CONFLICT (id) DO UPDATE SET
-                    service_type = EXCLUDED.service_type,
-                    name = EXCLUDED.name,
-                    host = EXCLUDED.host,
-                    port = EXCLUDED.port,
-                    username = EXCLUDED.username,
-                    password = EXCLUDED.password,
-                    ssl_enabled = EXCLUDED.ssl_enabled,
-                    ssl_ca_cert = EXCLUDED.ssl_ca_cert,
-                    ssl_client_cert = EXCLUDED.ssl_client_cert,
-                    ssl_client_key = EXCLUDED.ssl_client_key,
-                    extra_config = EXCLUDED.extra_config,
-                    updated_at = NOW()
-                """,
+        async with self._acquire() as conn:
+            config.updated_at = await conn.fetchval(
+                _SQL_SAVE_SERVICE_CONFIG,
                 config.id,
                 config.service_type.value,
                 config.name,
@@ -81,74 +427,34 @@ class DatabaseClient:
 
     async def get_service_config(self, service_type: ServiceType) -> ServiceConfig | None:
         """Get service config by type."""
-        async with self._pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM service_configs WHERE service_type = $1",
-                service_type.value,
-            )
+        async with self._acquire() as conn:
+            row = await conn.fetchrow(_SQL_GET_SERVICE_CONFIG, service_type.value)
+            if row:
+                return _service_config_from_row(row)
+            return None
+
+    async def get_service_config_full(self, config_id: UUID) -> ServiceConfig | None:
+        """Get one service config by id, including credentials and certificates."""
+        async with self._acquire() as conn:
+            row = await conn.fetchrow(_SQL_GET_SERVICE_CONFIG_BY_ID, config_id)
             if row:
-                return ServiceConfig(
-                    id=row["id"],
-                    service_type=ServiceType(row["service_type"]),
-                    name=row["name"],
-                    host=row["host"],
-                    port=row["port"],
-                    username=row["username"],
-                    password=row["password"],
-                    ssl_enabled=row["ssl_enabled"],
-                    ssl_ca_cert=row["ssl_ca_cert"],
-                    ssl_client_cert=row["ssl_client_cert"],
-                    ssl_client_key=row["ssl_client_key"],
-                    extra_config=row["extra_config"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
+                return _service_config_from_row(row)
             return None
 
     async def get_all_service_configs(self) -> list[ServiceConfig]:
-        """Get all service configurations."""
-        async with self._pool.acquire() as conn:
-            rows = await conn.fetch("SELECT * FROM service_configs")
+        """Get summaries of all service configurations (no credentials or certificates)."""
+        async with self._acquire() as conn:
+            rows = await conn.fetch(_SQL_GET_ALL_SERVICE_CONFIGS)
             return [
-                ServiceConfig(
-                    id=row["id"],
-                    service_type=ServiceType(row["service_type"]),
-                    name=row["name"],
-                    host=row["host"],
-                    port=row["port"],
-                    username=row["username"],
-                    password=row["password"],
-                    ssl_enabled=row["ssl_enabled"],
-                    ssl_ca_cert=row["ssl_ca_cert"],
-                    ssl_client_cert=row["ssl_client_cert"],
-                    ssl_client_key=row["ssl_client_key"],
-                    extra_config=row["extra_config"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
-                for row in rows
+                _service_config_from_row(row, _SERVICE_CONFIG_SUMMARY_COLUMNS) for row in rows
             ]
 
     # User Profile
     async def save_user_profile(self, profile: UserProfile) -> UserProfile:
         """Insert or update user profile."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO user_profiles
-                    (id, username, display_name, public_key, avatar_url,
-                     status, bio, is_public, quota_bytes_per_day, created_at, updated_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                ON CONFLICT (username) DO UPDATE SET
-                    display_name = EXCLUDED.display_name,
-                    public_key = EXCLUDED.public_key,
-                    avatar_url = EXCLUDED.avatar_url,
-                    status = EXCLUDED.status,
-                    bio = EXCLUDED.bio,
-                    is_public = EXCLUDED.is_public,
-                    quota_bytes_per_day = EXCLUDED.quota_bytes_per_day,
-                    updated_at = NOW()
-                """,
+        async with self._acquire() as conn:
+            profile.updated_at = await conn.fetchval(
+                _SQL_SAVE_USER_PROFILE,
                 profile.id,
                 profile.username,
                 profile.display_name,
@@ -165,43 +471,18 @@ class DatabaseClient:
 
     async def get_user_profile(self) -> UserProfile | None:
         """Get the local user profile (there should only be one)."""
-        async with self._pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM user_profiles LIMIT 1")
+        async with self._acquire() as conn:
+            row = await conn.fetchrow(_SQL_GET_USER_PROFILE)
             if row:
-                return UserProfile(
-                    id=row["id"],
-                    username=row["username"],
-                    display_name=row["display_name"],
-                    public_key=row["public_key"],
-                    avatar_url=row["avatar_url"],
-                    status=row["status"],
-                    bio=row["bio"],
-                    is_public=row["is_public"],
-                    quota_bytes_per_day=row["quota_bytes_per_day"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
+                return _user_profile_from_row(row)
             return None
 
     # Contacts
     async def save_contact(self, contact: Contact) -> Contact:
         """Insert or update a contact."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO contacts
-                    (id, username, display_name, kafka_bootstrap_servers,
-                     public_key, notes, is_blocked, last_seen, created_at, updated_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                ON CONFLICT (username) DO UPDATE SET
-                    display_name = EXCLUDED.display_name,
-                    kafka_bootstrap_servers = EXCLUDED.kafka_bootstrap_servers,
-                    public_key = EXCLUDED.public_key,
-                    notes = EXCLUDED.notes,
-                    is_blocked = EXCLUDED.is_blocked,
-                    last_seen = EXCLUDED.last_seen,
-                    updated_at = NOW()
-                """,
+        async with self._acquire() as conn:
+            contact.updated_at = await conn.fetchval(
+                _SQL_SAVE_CONTACT,
                 contact.id,
                 contact.username,
                 contact.display_name,
@@ -217,74 +498,33 @@ class DatabaseClient:
 
     async def get_contact(self, username: str) -> Contact | None:
         """Get a contact by username."""
-        async with self._pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM contacts WHERE username = $1",
-                username,
-            )
+        async with self._acquire() as conn:
+            row = await conn.fetchrow(_SQL_GET_CONTACT, username)
             if row:
-                return Contact(
-                    id=row["id"],
-                    username=row["username"],
-                    display_name=row["display_name"],
-                    kafka_bootstrap_servers=row["kafka_bootstrap_servers"],
-                    public_key=row["public_key"],
-                    notes=row["notes"],
-                    is_blocked=row["is_blocked"],
-                    last_seen=row["last_seen"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
+                return _contact_from_row(row)
             return None
 
     async def get_all_contacts(self, include_blocked: bool = False) -> list[Contact]:
-        """Get all contacts."""
-        async with self._pool.acquire() as conn:
+        """Get all contacts (without notes; use get_contact for the full record)."""
+        async with self._acquire() as conn:
             if include_blocked:
-                rows = await conn.fetch("SELECT * FROM contacts ORDER BY username")
+                rows = await conn.fetch(_SQL_GET_ALL_CONTACTS)
             else:
-                rows = await conn.fetch(
-                    "SELECT * FROM contacts WHERE is_blocked = FALSE ORDER BY username"
-                )
-            return [
-                Contact(
-                    id=row["id"],
-                    username=row["username"],
-                    display_name=row["display_name"],
-                    kafka_bootstrap_servers=row["kafka_bootstrap_servers"],
-                    public_key=row["public_key"],
-                    notes=row["notes"],
-                    is_blocked=row["is_blocked"],
-                    last_seen=row["last_seen"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
-                for row in rows
-            ]
+                rows = await conn.fetch(_SQL_GET_UNBLOCKED_CONTACTS)
+            return [_contact_from_row(row, _CONTACT_LIST_COLUMNS) for row in rows]
 
     async def delete_contact(self, username: str) -> bool:
         """Delete a contact."""
-        async with self._pool.acquire() as conn:
-            result = await conn.execute(
-                "DELETE FROM contacts WHERE username = $1",
-                username,
-            )
+        async with self._acquire() as conn:
+            result = await conn.execute(_SQL_DELETE_CONTACT, username)
             return result == "DELETE 1"
 
     # Channels
     async def save_channel(self, channel: Channel) -> Channel:
         """Insert or update a channel."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO channels
-                    (name, description, is_joined, created_at, updated_at)
-                VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT (name) DO UPDATE SET
-                    description = EXCLUDED.description,
-                    is_joined = EXCLUDED.is_joined,
-                    updated_at = NOW()
-                """,
+        async with self._acquire() as conn:
+            channel.updated_at = await conn.fetchval(
+                _SQL_SAVE_CHANNEL,
                 channel.name,
                 channel.description,
                 channel.is_joined,
@@ -295,177 +535,111 @@ class DatabaseClient:
 
     async def get_channel(self, name: str) -> Channel | None:
         """Get a channel by name."""
-        async with self._pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM channels WHERE name = $1",
-                name,
-            )
+        async with self._acquire() as conn:
+            row = await conn.fetchrow(_SQL_GET_CHANNEL, name)
             if row:
-                return Channel(
-                    name=row["name"],
-                    description=row["description"],
-                    is_joined=row["is_joined"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
+                return _channel_from_row(row)
             return None
 
     async def get_all_channels(self, joined_only: bool = True) -> list[Channel]:
         """Get all channels."""
-        async with self._pool.acquire() as conn:
+        async with self._acquire() as conn:
             if joined_only:
-                rows = await conn.fetch("SELECT * FROM channels WHERE is_joined = TRUE ORDER BY name")
+                rows = await conn.fetch(_SQL_GET_JOINED_CHANNELS)
             else:
-                rows = await conn.fetch("SELECT * FROM channels ORDER BY name")
-            return [
-                Channel(
-                    name=row["name"],
-                    description=row["description"],
-                    is_joined=row["is_joined"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
-                for row in rows
-            ]
+                rows = await conn.fetch(_SQL_GET_ALL_CHANNELS)
+            return [_channel_from_row(row) for row in rows]
 
     async def delete_channel(self, name: str) -> bool:
         """Delete a channel."""
-        async with self._pool.acquire() as conn:
-            result = await conn.execute(
-                "DELETE FROM channels WHERE name = $1",
-                name,
-            )
+        async with self._acquire() as conn:
+            result = await conn.execute(_SQL_DELETE_CHANNEL, name)
             return result == "DELETE 1"
 
     # Messages
-    async def save_message(self, message: Message) -> Message:
-        """Save a message to history."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO messages
-                    (id, message_type, sender, recipient, channel,
-                     content, timestamp, is_outbound, is_read, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                ON CONFLICT (id) DO NOTHING
-                """,
-                message.id,
-                message.message_type,
-                message.sender,
-                message.recipient,
-                message.channel,
-                message.content,
-                message.timestamp,
-                message.is_outbound,
-                message.is_read,
-                message.created_at,
+    async def save_message(self, message: Message) -> Message | None:
+        """Save a message to history; returns None if it was already stored."""
+        async with self._acquire() as conn:
+            inserted = await conn.fetchval(_SQL_SAVE_MESSAGE, *_message_values(message))
+        return message if inserted is not None else None
+
+    async def save_messages(self, messages: list[Message]) -> None:
+        """Save many messages to history in one pipelined round trip."""
+        if not messages:
+            return
+        async with self._acquire() as conn:
+            await conn.executemany(_SQL_SAVE_MESSAGE, [_message_values(m) for m in messages])
+
+    async def import_messages(self, messages: Iterable[Message]) -> int:
+        """Bulk-load history over the COPY protocol; returns the number of new rows."""
+        async with self._acquire() as conn, conn.transaction():
+            await conn.execute(_SQL_CREATE_MESSAGE_STAGING)
+            await conn.copy_records_to_table(
+                "_messages_import",
+                records=(_message_values(m) for m in messages),
+                columns=_MESSAGE_COLUMNS,
             )
-        return message
+            result = await conn.execute(_SQL_MERGE_MESSAGE_STAGING)
+        return _row_count(result)
 
     async def get_messages(
         self,
         channel: str | None = None,
         contact: str | None = None,
         limit: int = 100,
-        before: datetime | None = None,
+        before: tuple[datetime, int] | None = None,
+        metadata_only: bool = False,
     ) -> list[Message]:
-        """Get messages, optionally filtered by channel or contact."""
-        async with self._pool.acquire() as conn:
-            conditions = []
-            params: list[Any] = []
-            param_idx = 1
-
-            if channel:
-                conditions.append(f"channel = ${param_idx}")
-                params.append(channel)
-                param_idx += 1
-            elif contact:
-                conditions.append(
-                    f"((sender = ${param_idx} AND is_outbound = FALSE) OR "
-                    f"(recipient = ${param_idx} AND is_outbound = TRUE))"
-                )
-                params.append(contact)
-                param_idx += 1
-
-            if before:
-                conditions.append(f"timestamp < ${param_idx}")
-                params.append(before)
-                param_idx += 1
-
-            where_clause = " AND ".join(conditions) if conditions else "TRUE"
-            params.append(limit)
-
-            rows = await conn.fetch(
-                f"""
-                SELECT * FROM messages
-                WHERE {where_clause}
-                ORDER BY timestamp DESC
-                LIMIT ${param_idx}
-                """,
-                *params,
-            )
-
-            return [
-                Message(
-                    id=row["id"],
-                    message_type=row["message_type"],
-                    sender=row["sender"],
-                    recipient=row["recipient"],
-                    channel=row["channel"],
-                    content=row["content"],
-                    timestamp=row["timestamp"],
-                    is_outbound=row["is_outbound"],
-                    is_read=row["is_read"],
-                    created_at=row["created_at"],
-                )
-                for row in reversed(rows)  # Return in chronological order
-            ]
+        """Get messages newest-first, optionally filtered by channel or contact.
+
+        Pages with keyset pagination: pass the (timestamp, id) of the oldest message
+        already seen as ``before`` to fetch the next page.
+        With metadata_only, message content is not transferred and comes back as b"".
+        """
+        # A channel takes precedence over a contact
+        filter_value = channel or contact or None
+        args: list[Any] = [filter_value] if filter_value else []
+        if before is not None:
+            args.extend(before)
+        args.append(limit)
+        key = (bool(channel), bool(contact) and not channel, before is not None)
+        full_sql, metadata_sql = _SQL_GET_MESSAGES[key]
+
+        async with self._acquire() as conn:
+            rows = await conn.fetch(metadata_sql if metadata_only else full_sql, *args)
+
+            return [_message_from_row(row) for row in rows]
 
     async def mark_messages_read(
         self, contact: str | None = None, channel: str | None = None
     ) -> int:
         """Mark messages as read."""
-        async with self._pool.acquire() as conn:
-            if channel:
-                result = await conn.execute(
-                    "UPDATE messages SET is_read = TRUE WHERE channel = $1 AND is_read = FALSE",
-                    channel,
-                )
-            elif contact:
-                result = await conn.execute(
-                    "UPDATE messages SET is_read = TRUE WHERE sender = $1 AND is_read = FALSE",
-                    contact,
-                )
-            else:
-                result = await conn.execute(
-                    "UPDATE messages SET is_read = TRUE WHERE is_read = FALSE"
-                )
-            # Parse "UPDATE N" to get count
-            return int(result.split()[-1]) if result else 0
+        # A channel takes precedence over a contact, as before
+        sender = None if channel else contact or None
+        async with self._acquire() as conn:
+            result = await conn.execute(_SQL_MARK_READ, channel or None, sender)
+            return _row_count(result)
 
     # Channel Keys
     async def save_channel_key(self, channel_name: str, key_id: str, encrypted_key: str) -> None:
         """Save an encrypted channel key."""
-        async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO channel_keys (channel_name, key_id, encrypted_key)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (channel_name, key_id) DO UPDATE SET
-                    encrypted_key = EXCLUDED.encrypted_key
-                """,
-                channel_name,
-                key_id,
-                encrypted_key,
+        async with self._acquire() as conn:
+            await conn.execute(_SQL_SAVE_CHANNEL_KEY, channel_name, key_id, encrypted_key)
+
+    async def save_channel_keys(self, channel_name: str, keys: dict[str, str]) -> None:
+        """Save several encrypted channel keys (key_id -> encrypted_key) in one round trip."""
+        if not keys:
+            return
+        async with self._acquire() as conn:
+            await conn.executemany(
+                _SQL_SAVE_CHANNEL_KEY,
+                [(channel_name, key_id, encrypted_key) for key_id, encrypted_key in keys.items()],
             )
 
     async def get_channel_keys(self, channel_name: str) -> dict[str, str]:
         """Get all keys for a channel."""
-        async with self._pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT key_id, encrypted_key FROM channel_keys WHERE channel_name = $1",
-                channel_name,
-            )
+        async with self._acquire() as conn:
+            rows = await conn.fetch(_SQL_GET_CHANNEL_KEYS, channel_name)
             return {row["key_id"]: row["encrypted_key"] for row in rows}
 
     async def __aenter__(self) -> "DatabaseClient":
@@ -10,6 +10,7 @@ async def reset_messages_table():
     print("Dropping messages table...")
     async with client._pool.acquire() as conn:
         await conn.execute("DROP TABLE IF EXISTS messages")
+    await client.reset_schema_hash()
     print("Messages table dropped. It will be recreated with new schema on next run.")
     await client.disconnect()
 
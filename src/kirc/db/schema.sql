@@ -71,6 +71,9 @@ CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender);
 CREATE INDEX IF NOT EXISTS idx_messages_recipient ON messages(recipient);
 CREATE INDEX IF NOT EXISTS idx_messages_channel ON messages(channel);
 CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp DESC);
+-- Keyset pagination of channel history: (channel, timestamp, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_messages_channel_timestamp_id
+    ON messages(channel, timestamp DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages(is_read) WHERE is_read = FALSE;
 
 -- Channel keys (symmetric keys for channel encryption)
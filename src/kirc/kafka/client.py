@@ -1,15 +1,76 @@
 """Async Kafka client for actor mailbox pattern."""
 
 import asyncio
+import inspect
+import logging
 import ssl
-from collections.abc import AsyncIterator, Callable
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
+import msgspec
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
-from aiokafka.errors import KafkaError
-
-from kirc.kafka.messages import Message
+from aiokafka.errors import ConsumerStoppedError, KafkaError
+
+from kirc.kafka.messages import MAGIC_BYTE, Message, MessageType
+from kirc.utils import generate_snowflake_id
+
+logger = logging.getLogger(__name__)
+
+# Producer batching: let sends accumulate briefly so a chatty outbox goes out as a few
+# compressed batches instead of one broker round trip per message.
+_PRODUCER_LINGER_MS = 20
+_PRODUCER_MAX_BATCH_SIZE = 256 * 1024
+_PRODUCER_COMPRESSION = "lz4"
+_PRODUCER_ACKS = 1
+
+# Consumer batching: pull up to this many records per poll and hand them to handlers together
+_FETCH_TIMEOUT_MS = 200
+_FETCH_MAX_RECORDS = 500
+# Broker-side fetch sizing: wait for a reasonable chunk of data per fetch, briefly
+_FETCH_MIN_BYTES = 16 * 1024
+_FETCH_MAX_WAIT_MS = 50
+_MAX_PARTITION_FETCH_BYTES = 1024 * 1024
+# Threads reserved for decoding polled batches off the event loop
+_PARSE_WORKERS = 2
+# Decoded batches buffered between a fetch loop and its dispatcher. A slow handler fills
+# this up and only then pushes back on fetching.
+_DISPATCH_QUEUE_SIZE = 16
+
+# Group membership timeouts: generous enough that a busy UI loop or a brief network stall
+# does not get us evicted from the group and force a stop-the-world rebalance
+_SESSION_TIMEOUT_MS = 30000
+_HEARTBEAT_INTERVAL_MS = 10000
+_MAX_POLL_INTERVAL_MS = 300000
+_REBALANCE_TIMEOUT_MS = 60000
+
+# Dropped (malformed) records are counted and reported at most this often
+_DROP_LOG_INTERVAL = 30.0
+
+# TLS 1.2 suites: ECDHE key exchange with AEAD ciphers (AES-GCM is hardware accelerated on
+# modern CPUs). TLS 1.3 suites are all AEAD already and are unaffected.
+_TLS_CIPHERS = "ECDHE+AESGCM:ECDHE+CHACHA20"
+
+
+def _parse_batch(values: list[bytes | None]) -> tuple[list[Message], int]:
+    """Decode raw record values, skipping malformed ones. Runs in the parse executor.
+
+    Returns the decoded messages and the number of records dropped.
+    """
+    messages = []
+    dropped = 0
+    for value in values:
+        # Records that don't start with our magic byte are not ours; skip without decoding
+        if not value or value[0] != MAGIC_BYTE:
+            dropped += 1
+            continue
+        try:
+            messages.append(Message.from_bytes(value))
+        except msgspec.DecodeError:
+            dropped += 1
+    return messages, dropped
 
 
 class KafkaClient:
@@ -37,9 +98,12 @@ class KafkaClient:
         topic_data_out: str = "data-out",
         topic_rpc_in: str = "rpc-in",
         topic_rpc_out: str = "rpc-out",
+        rebalance_timeout_ms: int = _REBALANCE_TIMEOUT_MS,
     ) -> None:
         self.bootstrap_servers = bootstrap_servers
         self.username = username
+        # Record key for our own outbound messages, encoded once
+        self._username_key = username.encode("utf-8")
         self.security_protocol = security_protocol
         self.sasl_mechanism = sasl_mechanism
         self.sasl_plain_username = sasl_plain_username
@@ -49,16 +113,27 @@ class KafkaClient:
         self.topic_data_out = topic_data_out
         self.topic_rpc_in = topic_rpc_in
         self.topic_rpc_out = topic_rpc_out
+        self.rebalance_timeout_ms = rebalance_timeout_ms
 
         self._ssl_context = self._create_ssl_context(ssl_cafile, ssl_certfile, ssl_keyfile)
 
         self._producer: AIOKafkaProducer | None = None
         self._consumer_data: AIOKafkaConsumer | None = None
         self._consumer_rpc: AIOKafkaConsumer | None = None
+        # Topics the data consumer should follow, tracked here so subscribe calls are cheap
+        self._subscribed: set[str] = {topic_data_in}
+        self._resubscribe_handle: asyncio.Handle | None = None
         self._running = False
-        self._message_handlers: list[Callable[[Message], Any]] = []
-        self._rpc_handlers: list[Callable[[Message], Any]] = []
-        self._pending_requests: dict[str, asyncio.Future] = {}
+        self._parse_executor: ThreadPoolExecutor | None = None
+        self._batch_handlers: list[Callable[[list[Message]], Awaitable[Any]]] = []
+        # One handler slot per MessageType value, so dispatch is a list index
+        self._rpc_dispatch: list[Callable[[Message], Any] | None] = [None] * len(MessageType)
+        # Whether each RPC handler is a coroutine function, decided once at registration
+        self._rpc_is_async: list[bool] = [False] * len(MessageType)
+        self._has_rpc_handlers = False
+        self._pending_requests: dict[int, asyncio.Future] = {}
+        self._dropped = 0
+        self._dropped_logged_at = time.monotonic()
 
     def _create_ssl_context(
         self,
@@ -74,6 +149,9 @@ class KafkaClient:
         if certfile and keyfile:
             context.load_cert_chain(certfile=str(certfile), keyfile=str(keyfile))
         context.check_hostname = True
+        context.set_ciphers(_TLS_CIPHERS)
+        # Keep session tickets enabled so the connections sharing this context can resume
+        context.options &= ~ssl.OP_NO_TICKET
         return context
 
     async def connect(self) -> None:
@@ -87,15 +165,32 @@ class KafkaClient:
             "sasl_plain_password": self.sasl_plain_password,
         }
 
-        self._producer = AIOKafkaProducer(**common_config)
+        self._producer = AIOKafkaProducer(
+            linger_ms=_PRODUCER_LINGER_MS,
+            max_batch_size=_PRODUCER_MAX_BATCH_SIZE,
+            compression_type=_PRODUCER_COMPRESSION,
+            acks=_PRODUCER_ACKS,
+            **common_config,
+        )
         await self._producer.start()
 
+        consumer_config = {
+            "fetch_min_bytes": _FETCH_MIN_BYTES,
+            "fetch_max_wait_ms": _FETCH_MAX_WAIT_MS,
+            "max_partition_fetch_bytes": _MAX_PARTITION_FETCH_BYTES,
+            "session_timeout_ms": _SESSION_TIMEOUT_MS,
+            "heartbeat_interval_ms": _HEARTBEAT_INTERVAL_MS,
+            "max_poll_interval_ms": _MAX_POLL_INTERVAL_MS,
+            "rebalance_timeout_ms": self.rebalance_timeout_ms,
+            **common_config,
+        }
+
         # Main consumer for our own inbox
         self._consumer_data = AIOKafkaConsumer(
             self.topic_data_in,
             group_id=f"kirc-{self.username}-data",
             auto_offset_reset="latest",
-            **common_config
+            **consumer_config
         )
         await self._consumer_data.start()
 
@@ -103,45 +198,59 @@ class KafkaClient:
             self.topic_rpc_in,
             group_id=f"kirc-{self.username}-rpc",
             auto_offset_reset="latest",
-            **common_config
+            **consumer_config
         )
         await self._consumer_rpc.start()
 
+        self._parse_executor = ThreadPoolExecutor(
+            max_workers=_PARSE_WORKERS, thread_name_prefix="kirc-kafka-parse"
+        )
         self._running = True
 
+        if self._ssl_context:
+            logger.debug("TLS session stats after connect: %s", self._ssl_context.session_stats())
+
     async def subscribe_to_topic(self, topic: str) -> None:
         """Subscribe to an additional topic (e.g., a channel leader's output)."""
         if not self._consumer_data:
             raise RuntimeError("Kafka client not connected")
-        
-        # AIOKafkaConsumer.subscribe replaces the subscription, so we need to track all topics
-        # But AIOKafkaConsumer also supports pattern subscription or adding partitions manually.
-        # However, the simplest way with the high-level consumer is to update the subscription list.
-        # Note: This might trigger a rebalance.
-        
-        current_topics = self._consumer_data.subscription() or set()
-        if topic not in current_topics:
-            new_topics = set(current_topics)
-            new_topics.add(topic)
-            self._consumer_data.subscribe(topics=list(new_topics))
+        if topic in self._subscribed:
+            return
+        self._subscribed.add(topic)
+        self._schedule_resubscribe()
 
     async def unsubscribe_from_topic(self, topic: str) -> None:
         """Unsubscribe from a topic."""
         if not self._consumer_data:
             raise RuntimeError("Kafka client not connected")
-            
-        current_topics = self._consumer_data.subscription() or set()
-        if topic in current_topics:
-            new_topics = set(current_topics)
-            new_topics.remove(topic)
-            # If no topics left, we can't pass empty list to subscribe usually, but let's see.
-            # We always keep self.topic_data_in, so it should be fine.
-            self._consumer_data.subscribe(topics=list(new_topics))
+        # We always keep topic_data_in, so the subscription never goes empty
+        if topic not in self._subscribed or topic == self.topic_data_in:
+            return
+        self._subscribed.discard(topic)
+        self._schedule_resubscribe()
+
+    def _schedule_resubscribe(self) -> None:
+        """Apply subscription changes once per event-loop tick.
+
+        AIOKafkaConsumer.subscribe replaces the whole subscription and triggers a group
+        rebalance, so joining several channels in a row should cost one rebalance, not one each.
+        """
+        if self._resubscribe_handle is None:
+            self._resubscribe_handle = asyncio.get_running_loop().call_soon(self._resubscribe)
+
+    def _resubscribe(self) -> None:
+        self._resubscribe_handle = None
+        if self._consumer_data:
+            self._consumer_data.subscribe(topics=list(self._subscribed))
 
     async def disconnect(self) -> None:
         """Disconnect from Kafka."""
         self._running = False
 
+        if self._resubscribe_handle:
+            self._resubscribe_handle.cancel()
+            self._resubscribe_handle = None
+
         if self._producer:
             await self._producer.stop()
             self._producer = None
@@ -154,120 +263,224 @@ class KafkaClient:
             await self._consumer_rpc.stop()
             self._consumer_rpc = None
 
-    def on_message(self, handler: Callable[[Message], Any]) -> None:
-        """Register a handler for incoming data messages."""
-        self._message_handlers.append(handler)
+        if self._parse_executor:
+            self._parse_executor.shutdown(wait=False)
+            self._parse_executor = None
 
-    def on_rpc(self, handler: Callable[[Message], Any]) -> None:
-        """Register a handler for incoming RPC messages."""
-        self._rpc_handlers.append(handler)
+    def on_messages(self, handler: Callable[[list[Message]], Awaitable[Any]]) -> None:
+        """Register a coroutine handler that receives each polled batch of data messages."""
+        self._batch_handlers.append(handler)
 
-    async def send_message(self, message: Message, topic: str | None = None) -> None:
-        """Send a message. If topic is None, sends to our own data-out."""
+    def on_message(self, handler: Callable[[Message], Any]) -> None:
+        """Register a handler for individual incoming data messages."""
+        if inspect.iscoroutinefunction(handler):
+
+            async def handle_each(messages: list[Message]) -> None:
+                for message in messages:
+                    try:
+                        await handler(message)
+                    except Exception:
+                        logger.exception("Error in message handler")
+
+        else:
+
+            async def handle_each(messages: list[Message]) -> None:
+                for message in messages:
+                    try:
+                        handler(message)
+                    except Exception:
+                        logger.exception("Error in message handler")
+
+        self._batch_handlers.append(handle_each)
+
+    def on_rpc(self, message_type: MessageType, handler: Callable[[Message], Any]) -> None:
+        """Register the handler for incoming RPC messages of the given type."""
+        self._rpc_dispatch[message_type] = handler
+        self._rpc_is_async[message_type] = inspect.iscoroutinefunction(handler)
+        self._has_rpc_handlers = True
+
+    def _key_for(self, message: Message) -> bytes:
+        """Partition key for a message: its sender, using the pre-encoded key for ourselves."""
+        if message.sender == self.username:
+            return self._username_key
+        return message.sender.encode("utf-8")
+
+    async def send_message(self, message: Message, topic: str | None = None) -> asyncio.Future:
+        """Queue a message for the next producer batch. If topic is None, sends to data-out.
+
+        Returns the delivery future; await it only if the record metadata is needed.
+        """
         if not self._producer:
             raise RuntimeError("Kafka client not connected")
 
         target_topic = topic or self.topic_data_out
-        
-        await self._producer.send_and_wait(
+
+        return await self._producer.send(
             target_topic,
             value=message.to_bytes(),
-            key=message.sender.encode("utf-8"),
+            key=self._key_for(message),
         )
 
-    async def send_rpc(self, message: Message, topic: str | None = None) -> None:
-        """Send an RPC message."""
+    async def send_message_sync(self, message: Message, topic: str | None = None) -> Any:
+        """Send a message and wait for the broker to acknowledge it."""
+        future = await self.send_message(message, topic)
+        return await future
+
+    async def send_rpc(self, message: Message, topic: str | None = None) -> asyncio.Future:
+        """Queue an RPC message for the next producer batch."""
         if not self._producer:
             raise RuntimeError("Kafka client not connected")
 
         target_topic = topic or self.topic_rpc_out
 
-        await self._producer.send_and_wait(
+        return await self._producer.send(
             target_topic,
             value=message.to_bytes(),
-            key=message.sender.encode("utf-8"),
+            key=self._key_for(message),
         )
 
+    async def flush(self) -> None:
+        """Wait until every queued record has been delivered."""
+        if not self._producer:
+            raise RuntimeError("Kafka client not connected")
+        await self._producer.flush()
+
     async def request(self, message: Message, topic: str | None = None, timeout: float = 10.0) -> Message:
         """Send an RPC request and wait for a response."""
         if not message.correlation_id:
-            message.correlation_id = uuid4()
-        
-        future = asyncio.Future()
-        self._pending_requests[str(message.correlation_id)] = future
+            # Snowflake ids are unique across peers, so a request from someone else can
+            # never be mistaken for a reply to one of ours
+            message.correlation_id = generate_snowflake_id()
+        correlation_id = message.correlation_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[correlation_id] = future
         
         try:
-            await self.send_rpc(message, topic)
+            # Wait for the broker ack (send_and_wait semantics) before awaiting the reply
+            delivery = await self.send_rpc(message, topic)
+            await delivery
             return await asyncio.wait_for(future, timeout)
         finally:
-            self._pending_requests.pop(str(message.correlation_id), None)
-
-    async def _consume_data(self) -> AsyncIterator[Message]:
-        """Consume messages from data-in topic."""
-        if not self._consumer_data:
-            raise RuntimeError("Kafka client not connected")
+            self._pending_requests.pop(correlation_id, None)
 
-        async for record in self._consumer_data:
-            try:
-                message = Message.from_bytes(record.value)
-                yield message
-            except Exception as e:
-                # Log and skip malformed messages
-                print(f"Error parsing message: {e}")
-
-    async def _consume_rpc(self) -> AsyncIterator[Message]:
-        """Consume messages from rpc-in topic."""
-        if not self._consumer_rpc:
-            raise RuntimeError("Kafka client not connected")
-
-        async for record in self._consumer_rpc:
+    async def _poll(self, consumer: AIOKafkaConsumer) -> list[Message]:
+        """Poll one batch of records and decode it on the parse executor."""
+        batches = await consumer.getmany(
+            timeout_ms=_FETCH_TIMEOUT_MS, max_records=_FETCH_MAX_RECORDS
+        )
+        if not batches:
+            return []
+        values = [record.value for records in batches.values() for record in records]
+        if not values:
+            return []
+        loop = asyncio.get_running_loop()
+        messages, dropped = await loop.run_in_executor(self._parse_executor, _parse_batch, values)
+        if dropped:
+            self._count_dropped(dropped)
+        return messages
+
+    def _count_dropped(self, dropped: int) -> None:
+        """Tally malformed records, logging the total at most once per interval."""
+        self._dropped += dropped
+        now = time.monotonic()
+        if now - self._dropped_logged_at >= _DROP_LOG_INTERVAL:
+            logger.warning(
+                "Dropped %d malformed records in the last %.0fs",
+                self._dropped,
+                now - self._dropped_logged_at,
+            )
+            self._dropped = 0
+            self._dropped_logged_at = now
+
+    async def _pump(
+        self,
+        consumer: AIOKafkaConsumer,
+        queue: asyncio.Queue[list[Message]],
+        wanted: Callable[[], bool],
+    ) -> None:
+        """Fetch and decode batches into the dispatch queue until the client stops.
+
+        While wanted() says nobody would consume them, the assigned partitions are paused
+        rather than drained: records are neither fetched nor decoded, and their offsets are
+        not committed. Everything that is fetched gets decoded and dispatched.
+        """
+        while self._running:
+            if wanted():
+                paused = consumer.paused()
+                if paused:
+                    consumer.resume(*paused)
+            else:
+                consumer.pause(*consumer.assignment())
             try:
-                message = Message.from_bytes(record.value)
-                yield message
-            except Exception as e:
-                print(f"Error parsing RPC message: {e}")
+                batch = await self._poll(consumer)
+            except ConsumerStoppedError:
+                # Stopped by disconnect(); end the loop like the old async-for did
+                break
+            if batch:
+                await queue.put(batch)
+        # An empty batch tells the dispatcher to stop
+        await queue.put([])
 
     async def _run_data_consumer(self) -> None:
-        """Run the data consumer loop."""
-        async for message in self._consume_data():
-            if not self._running:
-                break
-            for handler in self._message_handlers:
-                try:
-                    result = handler(message)
-                    if asyncio.iscoroutine(result):
-                        await result
-                except Exception as e:
-                    print(f"Error in message handler: {e}")
+        """Run the data consumer: fetch in the background, dispatch a batch at a time."""
+        consumer = self._consumer_data
+        if not consumer:
+            raise RuntimeError("Kafka client not connected")
+
+        queue: asyncio.Queue[list[Message]] = asyncio.Queue(maxsize=_DISPATCH_QUEUE_SIZE)
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._pump(consumer, queue, lambda: bool(self._batch_handlers)))
+            while batch := await queue.get():
+                results = await asyncio.gather(
+                    *(handler(batch) for handler in self._batch_handlers),
+                    return_exceptions=True,
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error("Error in message handler", exc_info=result)
 
     async def _run_rpc_consumer(self) -> None:
-        """Run the RPC consumer loop."""
-        async for message in self._consume_rpc():
-            if not self._running:
-                break
-            
-            # Check if this is a response to a pending request
-            if message.correlation_id and str(message.correlation_id) in self._pending_requests:
-                future = self._pending_requests[str(message.correlation_id)]
-                if not future.done():
-                    future.set_result(message)
-                continue
-
-            # Otherwise, dispatch to handlers
-            for handler in self._rpc_handlers:
-                try:
-                    result = handler(message)
-                    if asyncio.iscoroutine(result):
-                        await result
-                except Exception as e:
-                    print(f"Error in RPC handler: {e}")
+        """Run the RPC consumer: fetch in the background, dispatch a batch at a time."""
+        consumer = self._consumer_rpc
+        if not consumer:
+            raise RuntimeError("Kafka client not connected")
+
+        pending = self._pending_requests
+        dispatch = self._rpc_dispatch
+        is_async = self._rpc_is_async
+        queue: asyncio.Queue[list[Message]] = asyncio.Queue(maxsize=_DISPATCH_QUEUE_SIZE)
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(
+                self._pump(consumer, queue, lambda: self._has_rpc_handlers or bool(pending))
+            )
+            while batch := await queue.get():
+                for message in batch:
+                    # Check if this is a response to a pending request
+                    if message.correlation_id is not None:
+                        future = pending.pop(message.correlation_id, None)
+                        if future is not None:
+                            if not future.done():
+                                future.set_result(message)
+                            continue
+
+                    # Otherwise, dispatch to the handler registered for this type
+                    handler = dispatch[message.type]
+                    if handler is None:
+                        continue
+                    try:
+                        if is_async[message.type]:
+                            await handler(message)
+                        else:
+                            handler(message)
+                    except Exception:
+                        logger.exception("Error in RPC handler")
 
     async def run(self) -> None:
-        """Run both consumer loops concurrently."""
-        await asyncio.gather(
-            self._run_data_consumer(),
-            self._run_rpc_consumer(),
-        )
+        """Run both consumer loops concurrently; if one fails, the other is cancelled."""
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._run_data_consumer())
+            tg.create_task(self._run_rpc_consumer())
 
     async def __aenter__(self) -> "KafkaClient":
         await self.connect()
@@ -1,107 +1,115 @@
 """Message types for Kafka communication using msgpack for compact serialization."""
 
 from datetime import datetime, timezone
-from enum import Enum
-from typing import Any
-from uuid import UUID, uuid4
+from enum import IntEnum
+from typing import Any, Final
 
-import msgpack
-from pydantic import BaseModel, Field
-
-
-def _encode_extended(obj: Any) -> Any:
-    """Encode extended types for msgpack."""
-    if isinstance(obj, UUID):
-        return {"__uuid__": str(obj)}
-    if isinstance(obj, datetime):
-        return {"__datetime__": obj.isoformat()}
-    if isinstance(obj, Enum):
-        return {"__enum__": obj.value}
-    return obj
+import msgspec
 
+from kirc.utils import generate_snowflake_id
 
-def _decode_extended(obj: Any) -> Any:
-    """Decode extended types from msgpack."""
-    if isinstance(obj, dict):
-        if "__uuid__" in obj:
-            return UUID(obj["__uuid__"])
-        if "__datetime__" in obj:
-            return datetime.fromisoformat(obj["__datetime__"])
-        if "__enum__" in obj:
-            return obj["__enum__"]
-    return obj
 
+class MessageType(IntEnum):
+    """Types of messages that can be sent via Kafka.
 
-class MessageType(str, Enum):
-    """Types of messages that can be sent via Kafka."""
+    Values are dense small ints: they go on the wire as a single byte and index the RPC
+    dispatch table, so never renumber existing members; only append.
+    """
 
     # Data messages
-    CHAT = "chat"
-    DIRECT = "direct"
-    BROADCAST = "broadcast"
+    CHAT = 0
+    DIRECT = 1
+    BROADCAST = 2
 
     # RPC messages
-    PING = "ping"
-    PONG = "pong"
-    PRESENCE = "presence"
-    TYPING = "typing"
-    ACK = "ack"
-    FETCH_HISTORY = "fetch_history"
-    HISTORY_DATA = "history_data"
-    CHANNEL_KEY_UPDATE = "channel_key_update"
+    PING = 3
+    PONG = 4
+    PRESENCE = 5
+    TYPING = 6
+    ACK = 7
+    FETCH_HISTORY = 8
+    HISTORY_DATA = 9
+    CHANNEL_KEY_UPDATE = 10
 
 
-from kirc.utils import generate_snowflake_id
+# First byte of every encoded message, so foreign or corrupt records are rejected
+# before any decoding is attempted ("K")
+MAGIC_BYTE: Final = 0x4B
+_MAGIC_PREFIX: Final = bytes([MAGIC_BYTE])
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 
-class Message(BaseModel):
-    """Base message structure for all Kafka messages."""
+class Message(msgspec.Struct, kw_only=True, array_like=True, gc=False):
+    """Message structure for all Kafka messages.
 
-    id: int = Field(default_factory=generate_snowflake_id)
-    correlation_id: UUID | None = Field(default=None, description="ID for RPC request-response correlation")
+    A single struct for every kind of message: ``type`` says which of the optional
+    per-kind fields (content, channel, status, is_typing) are meaningful. Build them with
+    the factory helpers below.
+
+    Encoded as a positional msgpack array (no field names on the wire), so field order is
+    part of the format: only ever append new fields, at the end.
+
+    Instances are not tracked by the garbage collector (gc=False): a message never refers
+    back to itself, so there are no cycles to collect and large batches decode without
+    triggering collections.
+    """
+
+    id: int = msgspec.field(default_factory=generate_snowflake_id)
+    # ID for RPC request-response correlation (a snowflake id)
+    correlation_id: int | None = None
     type: MessageType
-    sender: str = Field(description="Sender's username")
-    recipient: str | None = Field(
-        default=None, description="Recipient username (None for broadcast)"
-    )
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    payload: dict[str, Any] = Field(default_factory=dict)
+    # Sender's username
+    sender: str
+    # Recipient username (None for broadcast)
+    recipient: str | None = None
+    timestamp: datetime = msgspec.field(default_factory=_utcnow)
+    payload: dict[str, Any] = msgspec.field(default_factory=dict)
+    # CHAT / DIRECT: message text content
+    content: str | None = None
+    # CHAT: channel name if applicable
+    channel: str | None = None
+    # PRESENCE: online, away, offline
+    status: str | None = None
+    # TYPING
+    is_typing: bool | None = None
 
     def to_bytes(self) -> bytes:
-        """Serialize message to msgpack bytes."""
-        data = self.model_dump(mode="python")
-        return msgpack.packb(data, default=_encode_extended, strict_types=False)
+        """Serialize message to magic-prefixed msgpack bytes."""
+        return _MAGIC_PREFIX + _ENC.encode(self)
 
     @classmethod
     def from_bytes(cls, data: bytes) -> "Message":
-        """Deserialize message from msgpack bytes."""
-        unpacked = msgpack.unpackb(data, object_hook=_decode_extended, raw=False)
-        return cls.model_validate(unpacked)
+        """Deserialize message from magic-prefixed msgpack bytes."""
+        if not data or data[0] != MAGIC_BYTE:
+            raise msgspec.DecodeError("Missing message magic byte")
+        return _DEC.decode(memoryview(data)[1:])
 
 
-class ChatMessage(Message):
-    """A chat message with text content."""
+# UUID, datetime and Enum are native to msgspec's msgpack codec; no extension hooks needed
+_ENC = msgspec.msgpack.Encoder()
+_DEC = msgspec.msgpack.Decoder(Message)
 
-    type: MessageType = MessageType.CHAT
-    content: str = Field(description="Message text content")
-    channel: str | None = Field(default=None, description="Channel name if applicable")
 
+def chat_message(sender: str, content: str, channel: str | None = None, **fields: Any) -> Message:
+    """Build a chat message."""
+    return Message(type=MessageType.CHAT, sender=sender, content=content, channel=channel, **fields)
 
-class DirectMessage(Message):
-    """A direct message to a specific user."""
 
-    type: MessageType = MessageType.DIRECT
-    content: str = Field(description="Message text content")
-
-
-class PresenceMessage(Message):
-    """Presence update message."""
+def direct_message(sender: str, recipient: str, content: str, **fields: Any) -> Message:
+    """Build a direct message to a specific user."""
+    return Message(
+        type=MessageType.DIRECT, sender=sender, recipient=recipient, content=content, **fields
+    )
 
-    type: MessageType = MessageType.PRESENCE
-    status: str = Field(description="online, away, offline")
 
+def presence_message(sender: str, status: str, **fields: Any) -> Message:
+    """Build a presence update message."""
+    return Message(type=MessageType.PRESENCE, sender=sender, status=status, **fields)
 
-class TypingMessage(Message):
-    """Typing indicator message."""
 
-    type: MessageType = MessageType.TYPING
-    is_typing: bool = Field(default=True)
+def typing_message(sender: str, is_typing: bool = True, **fields: Any) -> Message:
+    """Build a typing indicator message."""
+    return Message(type=MessageType.TYPING, sender=sender, is_typing=is_typing, **fields)
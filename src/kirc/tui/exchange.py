@@ -1,14 +1,15 @@
 """Credential Exchange Screens for K-IRC."""
 
 import base64
-import json
+
+import orjson
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical
 from textual.screen import Screen
 from textual.widgets import Button, Footer, Header, Input, Label, Static, TextArea
 from textual.reactive import reactive
 
-from kirc.crypto import encrypt_message, decrypt_message, load_key_from_file
+from kirc.crypto import decrypt_message_async, encrypt_message_async
 
 
 class ShowIdentityScreen(Screen):
@@ -73,12 +74,12 @@ class ShowIdentityScreen(Screen):
         yield Footer()
 
     def on_mount(self) -> None:
-        try:
-            with open("id_rsa.pub", "r") as f:
-                pub_key = f.read()
-                self.query_one("#pub-key-display", TextArea).text = pub_key
-        except Exception as e:
-            self.query_one("#pub-key-display", TextArea).text = f"ERROR: Could not load public key: {e}"
+        # Loaded once by the app at startup; no file IO on the UI thread
+        pub_key = self.app.public_key_text
+        if pub_key:
+            self.query_one("#pub-key-display", TextArea).text = pub_key
+        else:
+            self.query_one("#pub-key-display", TextArea).text = "ERROR: Could not load public key"
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back-btn":
@@ -151,13 +152,13 @@ class InviteGenScreen(Screen):
             yield Button("RETURN_TO_CONSOLE", id="back-btn", variant="error")
         yield Footer()
 
-    def on_button_pressed(self, event: Button.Pressed) -> None:
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back-btn":
             self.app.pop_screen()
         elif event.button.id == "encrypt-btn":
-            self.generate_bundle()
+            await self.generate_bundle()
 
-    def generate_bundle(self) -> None:
+    async def generate_bundle(self) -> None:
         pub_key_str = self.query_one("#pub-key-input", TextArea).text
         if not pub_key_str:
             self.app.notify("Error: Peer Public Key required", severity="error")
@@ -167,16 +168,8 @@ class InviteGenScreen(Screen):
             # Fetch actual credentials and identity
             settings = self.app.settings
             
-            # We need our own public key to send to them
-            my_public_key = None
-            try:
-                # Assuming public key is stored in settings or loaded from file
-                # For now, let's try to load it from the default location if not in settings
-                # In a real app, this should be in memory
-                with open("id_rsa.pub", "r") as f:
-                    my_public_key = f.read()
-            except Exception:
-                pass
+            # We need our own public key to send to them (cached by the app)
+            my_public_key = self.app.public_key_text
 
             payload = {
                 "sender": {
@@ -195,10 +188,10 @@ class InviteGenScreen(Screen):
                     }
                 }
             }
-            payload_bytes = json.dumps(payload).encode("utf-8")
+            payload_bytes = orjson.dumps(payload)
             
-            # Encrypt
-            encrypted = encrypt_message(pub_key_str.encode("utf-8"), payload_bytes)
+            # Encrypt (RSA work runs in a worker thread so the UI stays responsive)
+            encrypted = await encrypt_message_async(pub_key_str.encode("utf-8"), payload_bytes)
             bundle = base64.b64encode(encrypted).decode("utf-8")
             
             self.query_one("#bundle-output", TextArea).text = bundle
@@ -269,11 +262,11 @@ class InviteAcceptScreen(Screen):
             yield Button("RETURN_TO_CONSOLE", id="back-btn", variant="error")
         yield Footer()
 
-    def on_button_pressed(self, event: Button.Pressed) -> None:
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back-btn":
             self.app.pop_screen()
         elif event.button.id == "decrypt-btn":
-            self.process_bundle()
+            await self.process_bundle()
 
     async def process_bundle(self) -> None:
         bundle_str = self.query_one("#bundle-input", TextArea).text
@@ -288,9 +281,9 @@ class InviteAcceptScreen(Screen):
             
             # Decode and Decrypt
             encrypted_bytes = base64.b64decode(bundle_str)
-            decrypted_bytes = decrypt_message(self.app.private_key, encrypted_bytes)
+            decrypted_bytes = await decrypt_message_async(self.app.private_key, encrypted_bytes)
             
-            payload = json.loads(decrypted_bytes.decode("utf-8"))
+            payload = orjson.loads(decrypted_bytes)
             
             sender_info = payload.get("sender", {})
             username = sender_info.get("username")
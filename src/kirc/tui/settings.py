@@ -1,13 +1,10 @@
 """Settings Screen for K-IRC."""
 
-from pathlib import Path
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical, Horizontal
 from textual.screen import Screen
 from textual.widgets import Button, Footer, Header, Label, Static
 
-from kirc.config import load_settings
-
 
 class SettingsScreen(Screen):
     """Screen to view and verify current configuration."""
@@ -72,12 +69,9 @@ class SettingsScreen(Screen):
     """
 
     def compose(self) -> ComposeResult:
-        settings = load_settings()
-        
-        # Check certs
-        ca_exists = Path(settings.kafka.ssl_cafile).exists()
-        cert_exists = Path(settings.kafka.ssl_certfile).exists()
-        key_exists = Path(settings.kafka.ssl_keyfile).exists()
+        # Both are cached on the app, so recomposing does no file IO
+        settings = self.app.settings
+        ca_exists, cert_exists, key_exists = self.app.cert_status
         
         yield Header()
         with Container(id="settings-container"):
@@ -1,38 +1,151 @@
-from datetime import datetime
+import bisect
+import threading
+import time
+from collections.abc import Callable
+from rich.console import Group
+from rich.padding import Padding
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+from textual import events
 from textual.app import ComposeResult
-from textual.containers import Horizontal, Vertical
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.widgets import Input, Label, ListItem, ListView, Static
 from textual.reactive import reactive
 import random
 
-class ChatMessage(ListItem):
-    """A widget to display a single chat message with metadata."""
-
-    def __init__(self, sender: str, message: str, timestamp: str = None) -> None:
-        super().__init__()
-        self.sender = sender
-        self.message = message
-        self.timestamp = timestamp or datetime.now().strftime("%H:%M")
-
-    def compose(self) -> ComposeResult:
-        with Horizontal(classes="message-header"):
-            yield Label(f"<{self.sender}>", classes="message-sender")
-            yield Label(self.timestamp, classes="message-time")
-        yield Label(self.message, classes="message-content")
-
-
-class MessageList(ListView):
-    """Widget displaying chat messages."""
-
-    def compose(self) -> ComposeResult:
-        # Initial boot messages
-        yield ListItem(Label("[bold green]SYSTEM_BOOT_SEQUENCE_INITIATED...[/]"))
-        yield ListItem(Label("[bold cyan]CONNECTING_TO_NEURAL_NET...[/]"))
-        yield ListItem(Label("[bold magenta]ACTOR_MAILBOX_READY[/]"))
+# How often the background thread samples CPU and memory usage
+_STATS_SAMPLE_INTERVAL = 2.0
+
+# Last formatted "HH:MM" and the epoch minute it belongs to, reused for a burst of messages
+_LAST_MIN_TS = 0
+_LAST_MIN_STR = ""
+
+
+def _current_minute() -> str:
+    """Local time as "HH:MM", formatted at most once per minute."""
+    global _LAST_MIN_TS, _LAST_MIN_STR
+    now = time.time()
+    minute = int(now // 60)
+    if minute != _LAST_MIN_TS:
+        lt = time.localtime(now)
+        _LAST_MIN_STR = f"{lt.tm_hour:02d}:{lt.tm_min:02d}"
+        _LAST_MIN_TS = minute
+    return _LAST_MIN_STR
+
+
+class MessageList(ScrollView, can_focus=True):
+    """Widget displaying chat messages.
+
+    Messages are pre-rendered into lines when they arrive and only the rows in view are
+    drawn, so appending is O(1) and repainting doesn't grow with the backlog.
+    """
+
+    COMPONENT_CLASSES = {
+        "message-list--sender",
+        "message-list--time",
+        "message-list--content",
+    }
+
+    # Initial boot messages
+    BOOT_LINES = (
+        "[bold green]SYSTEM_BOOT_SEQUENCE_INITIATED...[/]",
+        "[bold cyan]CONNECTING_TO_NEURAL_NET...[/]",
+        "[bold magenta]ACTOR_MAILBOX_READY[/]",
+    )
+
+    def __init__(
+        self, *, name: str | None = None, id: str | None = None, classes: str | None = None
+    ) -> None:
+        super().__init__(name=name, id=id, classes=classes)
+        # (sender, text, timestamp); sender is None for system lines given as markup
+        self._messages: list[tuple[str | None, str, str]] = [
+            (None, line, "") for line in self.BOOT_LINES
+        ]
+        self._lines: list[Strip] = []
+        # Width and component styles the cached lines were rendered with; 0 until sized
+        self._render_width = 0
+        self._render_styles: tuple[Style, ...] = ()
+
+    def _render_message(self, message: tuple[str | None, str, str], width: int) -> list[Strip]:
+        """Render one message into lines at the given width."""
+        sender, text, timestamp = message
+        if sender is None:
+            renderable = Text.from_markup(text)
+        else:
+            header = Text.assemble(
+                (f"<{sender}>", self.get_component_rich_style("message-list--sender")),
+                " ",
+                (timestamp, self.get_component_rich_style("message-list--time")),
+            )
+            content = Text(text, style=self.get_component_rich_style("message-list--content"))
+            renderable = Group(header, Padding(content, (0, 1)))
+
+        console = self.app.console
+        segments = console.render(renderable, console.options.update_width(width))
+        lines = Strip.from_lines(list(Segment.split_lines(segments)))
+        if sender is not None:
+            # Spacing between chat messages
+            lines.append(Strip.blank(width))
+        return lines
+
+    def _message_styles(self) -> tuple[Style, ...]:
+        return tuple(self.get_component_rich_style(name) for name in self.COMPONENT_CLASSES)
+
+    def _rerender(self, width: int) -> None:
+        """Render every message again into the line cache."""
+        self._render_width = width
+        self._render_styles = self._message_styles()
+        self._lines = [
+            line for message in self._messages for line in self._render_message(message, width)
+        ]
+        self.virtual_size = Size(width, len(self._lines))
+        self.refresh()
+
+    def on_resize(self, event: events.Resize) -> None:
+        """Re-render the cached lines when the available width changes."""
+        width = self.scrollable_content_region.width
+        if width != self._render_width:
+            self._rerender(width)
+
+    def notify_style_update(self) -> None:
+        """Re-render the cached lines when the message styles change (e.g. theme switch)."""
+        super().notify_style_update()
+        if self._render_width and self._message_styles() != self._render_styles:
+            self._rerender(self._render_width)
 
     async def add_message(self, user: str, message: str):
-        await self.mount(ChatMessage(user, message))
-        self.scroll_end()
+        entry = (user, message, _current_minute())
+        self._messages.append(entry)
+        # Before the first resize there is no width yet; on_resize renders everything
+        if self._render_width:
+            self._lines.extend(self._render_message(entry, self._render_width))
+            self.virtual_size = Size(self._render_width, len(self._lines))
+        self.refresh()
+        self.scroll_end(animate=False, x_axis=False)
+
+    def clear(self) -> None:
+        """Remove all messages."""
+        self._messages.clear()
+        self._lines.clear()
+        self.virtual_size = Size(self._render_width, 0)
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.scrollable_content_region.width
+        index = scroll_y + y
+        if index >= len(self._lines):
+            return Strip.blank(width, self.rich_style)
+        return self._lines[index].crop_extend(scroll_x, scroll_x + width, self.rich_style)
+
+
+def _channel_label(name: str, is_active: bool) -> Text:
+    if is_active:
+        return Text(f">> #{name}", style="bold cyan")
+    return Text(f"   #{name}", style="dim cyan")
 
 
 class ChannelItem(ListItem):
@@ -42,11 +155,20 @@ class ChannelItem(ListItem):
         super().__init__()
         self.channel_name = name
         self.is_active = is_active
+        # Built once here so repopulating the sidebar doesn't redo it per compose
+        self._label_text = _channel_label(name, is_active)
 
     def compose(self) -> ComposeResult:
-        prefix = ">>" if self.is_active else "  "
-        style = "bold cyan" if self.is_active else "dim cyan"
-        yield Label(f"{prefix} #{self.channel_name}", classes=f"channel-name {style}")
+        yield Label(self._label_text, classes="channel-name")
+
+    def set_active(self, is_active: bool) -> None:
+        """Switch the active marker in place, without remounting."""
+        if is_active == self.is_active:
+            return
+        self.is_active = is_active
+        self._label_text = _channel_label(self.channel_name, is_active)
+        for label in self.query(Label):
+            label.update(self._label_text)
 
 
 class DMItem(ListItem):
@@ -58,9 +180,10 @@ class DMItem(ListItem):
         super().__init__()
         self.username = username
         self.status = status
+        self._label_text = Text(f"● {username}")
 
     def compose(self) -> ComposeResult:
-        yield Label(f"● {self.username}", id=f"dm-{self.username}", classes="dm-name")
+        yield Label(self._label_text, id=f"dm-{self.username}", classes="dm-name")
 
     def watch_status(self, new_status: str) -> None:
         """Update color based on status."""
@@ -74,30 +197,73 @@ class DMItem(ListItem):
             pass
 
 
+async def _sync_items(
+    view: ListView,
+    current: dict[str, ListItem],
+    keys: list[str],
+    make: Callable[[str], ListItem],
+) -> None:
+    """Bring a sidebar list in line with keys, reusing the rows it already has.
+
+    Rows for keys that went away are removed and rows for new keys are created with make;
+    everything else stays mounted for the caller to update in place.
+    """
+    wanted = set(keys)
+    stale = [current.pop(key) for key in list(current) if key not in wanted]
+    if stale:
+        await view.remove_children(stale)
+    if not current:
+        # (Re)populating from empty: one batched mount for the whole list
+        current.update({key: make(key) for key in keys})
+        await view.extend(list(current.values()))
+        return
+    for index, key in enumerate(keys):
+        if key not in current:
+            current[key] = make(key)
+            await view.insert(index, [current[key]])
+
+
 class NodeList(ListView):
     """Widget displaying available nodes (channels)."""
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._items: dict[str, ChannelItem] = {}
+
     def compose(self) -> ComposeResult:
         # Start empty, populated by App
         return []
 
     async def update_channels(self, channels: list[str], active_channel: str = None):
-        self.clear()
-        for channel in channels:
-            self.append(ChannelItem(channel, is_active=(channel == active_channel)))
+        await _sync_items(
+            self,
+            self._items,
+            channels,
+            lambda name: ChannelItem(name, is_active=(name == active_channel)),
+        )
+        for name, item in self._items.items():
+            item.set_active(name == active_channel)
 
 
 class DMList(ListView):
     """Widget displaying direct messages."""
     
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._items: dict[str, DMItem] = {}
+
     def compose(self) -> ComposeResult:
         # Start empty, populated by App
         return []
 
     async def update_contacts(self, contacts: list[dict]):
-        self.clear()
-        for contact in contacts:
-            self.append(DMItem(contact["username"], contact.get("status", "offline")))
+        statuses = {contact["username"]: contact.get("status", "offline") for contact in contacts}
+        await _sync_items(
+            self, self._items, list(statuses), lambda username: DMItem(username, statuses[username])
+        )
+        # Reactive: only rows whose status actually changed get restyled
+        for username, item in self._items.items():
+            item.status = statuses[username]
 
 
 class SystemStatus(Static):
@@ -110,23 +276,49 @@ class SystemStatus(Static):
 
     def on_mount(self) -> None:
         """Start the system monitoring simulation."""
+        # Resolve the child widgets once; they live as long as the status bar
+        self._conn = self.query_one("#connection-status", Static)
+        self._stats = self.query_one("#system-stats", Static)
+        self._uplink = self.query_one("#uplink-stats", Static)
+        # Last values shown, so a tick that changes nothing doesn't repaint
+        self._last_cpu: int | None = None
+        self._last_mem: int | None = None
+        self._last_uplink_str = ""
+        # Latest samples, written by the sampler thread and only read on the UI thread
+        self._cpu: int | None = None
+        self._mem: int | None = None
+        self._sampler_stop = threading.Event()
+        threading.Thread(target=self._sampler, name="kirc-stats", daemon=True).start()
         self.set_interval(1.0, self.update_stats)
 
-    def update_stats(self) -> None:
-        """Update real system stats."""
+    def on_unmount(self) -> None:
+        self._sampler_stop.set()
+
+    def _sampler(self) -> None:
+        """Sample CPU and memory usage off the UI thread."""
         import psutil
-        cpu = psutil.cpu_percent()
-        mem = psutil.virtual_memory().percent
-        
+        while True:
+            self._cpu = int(psutil.cpu_percent())
+            self._mem = int(psutil.virtual_memory().percent)
+            if self._sampler_stop.wait(_STATS_SAMPLE_INTERVAL):
+                return
+
+    def update_stats(self) -> None:
+        """Update real system stats from the latest samples."""
+        cpu, mem = self._cpu, self._mem
+        if cpu is not None and mem is not None and (cpu, mem) != (self._last_cpu, self._last_mem):
+            self._last_cpu, self._last_mem = cpu, mem
+            self._stats.update(f"[dim]MEM: {mem}% | CPU: {cpu}%[/]")
+
         # Uplink is harder to measure without tracking throughput, 
         # so we'll keep it as a small random number or 0 for now.
-        uplink = random.uniform(0.0, 5.0) 
-        
-        self.query_one("#system-stats", Static).update(f"[dim]MEM: {mem}% | CPU: {cpu}%[/]")
-        self.query_one("#uplink-stats", Static).update(f"[dim]UPLINK: {uplink:.1f} Kbps[/]")
+        uplink_str = f"{random.uniform(0.0, 5.0):.1f}"
+        if uplink_str != self._last_uplink_str:
+            self._last_uplink_str = uplink_str
+            self._uplink.update(f"[dim]UPLINK: {uplink_str} Kbps[/]")
 
     def set_status(self, status: str, color: str = "green"):
-        self.query_one("#connection-status", Static).update(f"[bold {color}]{status}[/]")
+        self._conn.update(f"[bold {color}]{status}[/]")
 
 
 class ChatInput(Input):
@@ -139,15 +331,46 @@ class ChatInput(Input):
 class TypingIndicator(Static):
     """Shows who is currently typing."""
 
-    users = reactive(set())
-
     def __init__(self, **kwargs) -> None:
         super().__init__("", **kwargs)
-
-    def watch_users(self, users: set[str]) -> None:
-        if not users:
-            self.update("")
+        # Typists kept sorted incrementally, and the text last shown
+        self._sorted: list[str] = []
+        self._last_text = ""
+
+    def add_typist(self, name: str) -> None:
+        """Mark a user as typing."""
+        index = bisect.bisect_left(self._sorted, name)
+        if index < len(self._sorted) and self._sorted[index] == name:
+            return
+        self._sorted.insert(index, name)
+        self._show()
+
+    def remove_typist(self, name: str) -> None:
+        """Mark a user as no longer typing."""
+        index = bisect.bisect_left(self._sorted, name)
+        if index == len(self._sorted) or self._sorted[index] != name:
+            return
+        del self._sorted[index]
+        self._show()
+
+    @property
+    def users(self) -> frozenset[str]:
+        """Users currently shown as typing."""
+        return frozenset(self._sorted)
+
+    @users.setter
+    def users(self, users: set[str]) -> None:
+        self._sorted = sorted(users)
+        self._show()
+
+    def _show(self) -> None:
+        """Update the display, skipping the refresh if the text is unchanged."""
+        names = self._sorted
+        if not names:
+            text = ""
         else:
-            names = ", ".join(sorted(list(users)))
-            suffix = "is typing..." if len(users) == 1 else "are typing..."
-            self.update(f"[dim italic]{names} {suffix}[/]")
+            suffix = "is typing..." if len(names) == 1 else "are typing..."
+            text = f"[dim italic]{', '.join(names)} {suffix}[/]"
+        if text != self._last_text:
+            self._last_text = text
+            self.update(text)
@@ -1,5 +1,13 @@
-import time
+import hashlib
+import os
 import threading
+import time
+
+# Bit layout, fixed for every generator
+_MACHINE_ID_SHIFT = 12
+_TIMESTAMP_SHIFT = 22
+_SEQUENCE_BITS = 12
+_SEQUENCE_MASK = 0xFFF
 
 class SnowflakeGenerator:
     """
@@ -14,57 +22,65 @@ class SnowflakeGenerator:
     
     def __init__(self, machine_id: int):
         self.machine_id = machine_id & 0x3FF  # 10 bits
-        self.sequence = 0
-        self.last_timestamp = -1
+        # (last_timestamp << 12) | sequence, so one read and one write per ID
+        self._state = -1 << _SEQUENCE_BITS
         
-        self.machine_id_shift = 12
-        self.timestamp_shift = 22
-        self.sequence_mask = 0xFFF
+        self.machine_id_shift = _MACHINE_ID_SHIFT
+        self.timestamp_shift = _TIMESTAMP_SHIFT
+        self.sequence_mask = _SEQUENCE_MASK
         
         # Custom epoch (2024-01-01 00:00:00 UTC)
         self.epoch = 1704067200000
         
         self._lock = threading.Lock()
 
-    def _current_timestamp(self) -> int:
-        return int(time.time() * 1000)
+        # Fixed per generator, so fold them once: building an ID is then one shift and two ORs
+        self._machine_id_bits = self.machine_id << _MACHINE_ID_SHIFT
+        self._neg_epoch = -self.epoch
+
+    @property
+    def sequence(self) -> int:
+        return self._state & _SEQUENCE_MASK
+
+    @property
+    def last_timestamp(self) -> int:
+        return self._state >> _SEQUENCE_BITS
 
     def next_id(self) -> int:
         with self._lock:
-            timestamp = self._current_timestamp()
+            # Integer milliseconds straight from time_ns: no float round trip
+            timestamp = time.time_ns() // 1_000_000
+            state = self._state
+            last_timestamp = state >> _SEQUENCE_BITS
 
-            if timestamp < self.last_timestamp:
+            if timestamp < last_timestamp:
                 raise Exception("Clock moved backwards!")
 
-            if timestamp == self.last_timestamp:
-                self.sequence = (self.sequence + 1) & self.sequence_mask
-                if self.sequence == 0:
+            if timestamp == last_timestamp:
+                sequence = (state + 1) & _SEQUENCE_MASK
+                if sequence == 0:
                     # Sequence exhausted, wait for next millisecond
-                    while timestamp <= self.last_timestamp:
-                        timestamp = self._current_timestamp()
+                    while timestamp <= last_timestamp:
+                        timestamp = time.time_ns() // 1_000_000
             else:
-                self.sequence = 0
+                sequence = 0
 
-            self.last_timestamp = timestamp
+            self._state = (timestamp << _SEQUENCE_BITS) | sequence
 
-            id = ((timestamp - self.epoch) << self.timestamp_shift) | \
-                 (self.machine_id << self.machine_id_shift) | \
-                 self.sequence
-            
-            return id
+        return (
+            ((timestamp + self._neg_epoch) << _TIMESTAMP_SHIFT) | self._machine_id_bits | sequence
+        )
 
 # Global instance
 # In a real distributed system, machine_id should be unique per node.
 # Here we'll just use a hash of the hostname or something random for now.
-import os
-import zlib
-
 def _get_machine_id() -> int:
     try:
-        # Use hostname hash
+        # Use hostname hash. Not hash(): it is salted per process, and the ID should be stable
         hostname = os.uname().nodename.encode()
-        return zlib.crc32(hostname) & 0x3FF
-    except:
+        return int.from_bytes(hashlib.blake2s(hostname, digest_size=2).digest(), "big") & 0x3FF
+    except (AttributeError, OSError):
+        # os.uname() is unavailable on Windows
         return 0
 
 _generator = SnowflakeGenerator(_get_machine_id())